@@ -3,9 +3,21 @@ import numpy as np
 from numpy.testing import assert_array_almost_equal
 from numpy.testing import assert_array_equal
 
-from ddp_algorithms import evaluate_policy
-from ddp_algorithms import bellman_equation
-from ddp_algorithms import state_wise_max
+from codes.ddp_algorithms import evaluate_policy
+from codes.ddp_algorithms import bellman_equation
+from codes.ddp_algorithms import state_wise_max
+from codes.ddp_algorithms import value_iteration
+from codes.ddp_algorithms import v_greedy
+from codes.ddp_algorithms import random_policy
+from codes.ddp_algorithms import policy_iteration
+from codes.ddp_algorithms import modified_policy_iteration
+from codes.ddp_algorithms import streamed_bellman_max
+from codes.ddp_algorithms import fused_bellman_max
+from codes.ddp_algorithms import feasible_grid
+from codes.ddp_auxiliary import get_grid
+from codes.ddp_auxiliary import get_grid_stochastic
+from codes.ddp_functions import rouwenhorst
+from codes.ddp_auxiliary import steady_state_order
 
 @pytest.fixture
 def setup_value_bellman():
@@ -118,4 +130,268 @@ def test_evaluate_policy(setup_evaluation_policy,expected_evaluate_policy):
         value_policy, 
         expected_evaluate_policy, 
         decimal=6
-    )
\ No newline at end of file
+    )
+
+def test_evaluate_policy_sparse(setup_evaluation_policy,expected_evaluate_policy):
+    value_policy = evaluate_policy(**setup_evaluation_policy, method="sparse")
+    assert_array_almost_equal(
+        value_policy, 
+        expected_evaluate_policy, 
+        decimal=6
+    )
+
+def test_evaluate_policy_cycle(setup_ramsey_grid):
+    k_grid, u_grid, beta = setup_ramsey_grid
+    rng = np.random.default_rng(0)
+    # Random policies have long tails and several cycles
+    for policy in [rng.integers(0, len(k_grid), len(k_grid)), np.arange(len(k_grid))[::-1]]:
+        value_cycle = evaluate_policy(policy, np.nan_to_num(u_grid), beta, method="cycle")
+        value_dense = evaluate_policy(policy, np.nan_to_num(u_grid), beta, method="dense")
+        assert_array_almost_equal(value_cycle, value_dense, decimal=8)
+
+def test_value_iteration_history(setup_evaluation_policy):
+    u_grid, beta = setup_evaluation_policy["u_grid"], setup_evaluation_policy["beta"]
+    value_store_iter, store_policy, num_iter = value_iteration(1e-06, 500, u_grid, beta)
+
+    result = value_iteration(1e-06, 500, u_grid, beta, history=("last", 2))
+    assert result.num_iter == num_iter
+    assert_array_equal(result.iterations, [num_iter - 1, num_iter])
+    assert_array_equal(result.policy, store_policy[num_iter,:])
+    assert_array_almost_equal(result.value_history, value_store_iter[num_iter-1:num_iter+1,:])
+
+@pytest.mark.parametrize("kernel", ["fused", "monotone", "concave", "binary"])
+def test_v_greedy_kernels(setup_ramsey_grid, kernel):
+    k_grid, u_grid, beta = setup_ramsey_grid
+    value_store_iter, store_policy, num_iter = value_iteration(1e-06, 500, u_grid, beta)
+    v = value_store_iter[num_iter - 1,:]
+
+    value_dense, policy_dense = v_greedy(v, u_grid, beta)
+    value_kernel, policy_kernel = v_greedy(v, u_grid, beta, kernel)
+    assert_array_equal(policy_kernel, policy_dense)
+    assert_array_almost_equal(value_kernel, value_dense, decimal=10)
+
+@pytest.mark.parametrize("backend", [None, "numba"])
+def test_infeasible_actions_skipped(setup_ramsey, backend):
+    if backend == "numba":
+        pytest.importorskip("numba")
+    # A wide grid with negative utilities, where counting infeasible
+    # actions as 0 would pick them
+    k_grid, c_grid, u_grid = get_grid(0.6, 80, **setup_ramsey)
+    beta = setup_ramsey["beta"]
+    assert np.nanmin(u_grid) < 0 and np.isnan(u_grid).any()
+
+    expected = value_iteration(1e-06, 1000, u_grid, beta, history="none")
+    states = np.arange(len(k_grid))
+    assert not np.isnan(u_grid[expected.policy, states]).any()
+
+    value, policy = v_greedy(expected.value, u_grid, beta, backend=backend)
+    assert_array_equal(policy, expected.policy)
+
+    results = [value_iteration(1e-06, 1000, u_grid, beta, history="none", backend=backend),
+               policy_iteration(1000, u_grid, beta, history="none", backend=backend, seed=0),
+               modified_policy_iteration(1e-06, 30, 1000, u_grid, beta, history="none", backend=backend)]
+    for result in results:
+        assert result.num_iter < 999
+        assert_array_equal(result.policy, expected.policy)
+
+def test_numba_backend_fallback(setup_evaluation_policy, monkeypatch):
+    from codes import ddp_numba
+    monkeypatch.setattr(ddp_numba, "HAS_NUMBA", False)
+
+    u_grid, beta = setup_evaluation_policy["u_grid"], setup_evaluation_policy["beta"]
+    with pytest.warns(UserWarning, match="numba is not installed"):
+        value_fallback, policy_fallback = v_greedy(np.zeros(3), u_grid, beta, backend="numba")
+
+    value, policy = v_greedy(np.zeros(3), u_grid, beta)
+    assert_array_equal(policy_fallback, policy)
+    assert_array_almost_equal(value_fallback, value)
+
+def test_warm_start(setup_ramsey_grid):
+    k_grid, u_grid, beta = setup_ramsey_grid
+    solution = value_iteration(1e-06, 500, u_grid, beta, history="none")
+
+    warm_value = value_iteration(1e-06, 500, u_grid, beta, history="none", v0=solution.value)
+    warm_policy = policy_iteration(500, u_grid, beta, history="none", policy0=solution.policy)
+    warm_modified = modified_policy_iteration(1e-06, 30, 500, u_grid, beta, history="none", v0=solution.value)
+
+    assert warm_value.num_iter <= 1
+    assert warm_policy.num_iter == 1
+    assert warm_modified.num_iter <= 1
+    for result in (warm_value, warm_policy, warm_modified):
+        assert_array_equal(result.policy, solution.policy)
+
+@pytest.mark.parametrize("accel", ["mqp", "relative", "anderson"])
+def test_value_iteration_accelerators(setup_ramsey_grid, accel):
+    k_grid, u_grid, beta = setup_ramsey_grid
+    plain = value_iteration(1e-06, 1000, u_grid, beta, history="none")
+    exact = value_iteration(1e-12, 2000, u_grid, beta, history="none")
+
+    result = value_iteration(1e-06, 1000, u_grid, beta, history="none", accel=accel)
+    assert result.num_iter < plain.num_iter
+    assert np.max(np.absolute(result.value - exact.value)) <= result.info["error_bound"] + 1e-10
+
+@pytest.mark.parametrize("ordered", [False, True])
+def test_gauss_seidel_sweeps(setup_ramsey_grid, ordered):
+    k_grid, u_grid, beta = setup_ramsey_grid
+    sweep = steady_state_order(k_grid, 0.3, beta, 0.1) if ordered else "gauss-seidel"
+    exact = value_iteration(1e-12, 2000, u_grid, beta, history="none")
+
+    jacobi = value_iteration(1e-06, 1000, u_grid, beta, history="none")
+    seidel = value_iteration(1e-06, 1000, u_grid, beta, history="none", sweep=sweep)
+    assert seidel.num_iter < jacobi.num_iter
+    assert_array_almost_equal(seidel.value, exact.value, decimal=4)
+
+    jacobi = modified_policy_iteration(1e-06, 30, 1000, u_grid, beta, history="none")
+    seidel = modified_policy_iteration(1e-06, 30, 1000, u_grid, beta, history="none", sweep=sweep)
+    assert seidel.num_iter <= jacobi.num_iter
+    assert_array_almost_equal(seidel.value, exact.value, decimal=4)
+
+    for sweep in (np.arange(len(k_grid) - 1), np.zeros(len(k_grid), dtype= int)):
+        with pytest.raises(ValueError):
+            value_iteration(1e-06, 1000, u_grid, beta, sweep=sweep)
+
+@pytest.mark.parametrize("sweep", [None, "gauss-seidel"])
+def test_modified_policy_iteration_without_evaluation(setup_ramsey_grid, sweep):
+    k_grid, u_grid, beta = setup_ramsey_grid
+    # k=0 skips the evaluation steps, which leaves value iteration
+    expected = value_iteration(1e-06, 1000, u_grid, beta, history="none", sweep=sweep)
+    result = modified_policy_iteration(1e-06, 0, 1000, u_grid, beta, history="none", sweep=sweep)
+    assert result.info["eval_steps"] == 0
+    assert_array_equal(result.policy, expected.policy)
+
+def test_modified_policy_iteration_adaptive(setup_ramsey_grid):
+    k_grid, u_grid, beta = setup_ramsey_grid
+    value_store_iter, store_policy, num_iter = modified_policy_iteration(1e-06, 30, 1000, u_grid, beta)
+    fixed = modified_policy_iteration(1e-06, 30, 1000, u_grid, beta, history="none")
+    adaptive = modified_policy_iteration(1e-06, 100, 1000, u_grid, beta, history="none", adaptive=True)
+
+    # num_iter indexes the converged policy, as in value_iteration
+    assert fixed.num_iter == num_iter
+    assert_array_equal(store_policy[num_iter,:], fixed.policy)
+    assert len(fixed.info["k_schedule"]) == num_iter
+
+    assert_array_equal(adaptive.policy, fixed.policy)
+    assert max(adaptive.info["k_schedule"]) <= 100
+    assert adaptive.info["k_schedule"][-1] < adaptive.info["k_schedule"][0]
+
+def test_mixed_precision(setup_ramsey_grid):
+    k_grid, u_grid, beta = setup_ramsey_grid
+    exact = value_iteration(1e-12, 2000, u_grid, beta, history="none")
+    result = value_iteration(1e-06, 1000, u_grid, beta, history="none", dtype=np.float32)
+
+    assert result.value.dtype == np.float64
+    assert result.info["low_iterations"] > result.num_iter - 5
+    assert "time_saved" in result.info
+    assert_array_equal(result.policy, exact.policy)
+    assert_array_almost_equal(result.value, exact.value, decimal=8)
+
+    v_bellman = bellman_equation(u_grid, exact.value, beta, dtype=np.float32)
+    value_fn, policy = state_wise_max(v_bellman, dtype=np.float32)
+    assert value_fn.dtype == np.float32
+    assert_array_almost_equal(value_fn, exact.value, decimal=4)
+
+    with pytest.raises(ValueError):
+        value_iteration(1e-06, 1000, u_grid, beta, dtype=np.float32, sweep="gauss-seidel")
+
+    # A single iteration leaves nothing to polish
+    single = value_iteration(1e-06, 1, u_grid, beta, history="none", dtype=np.float32)
+    assert single.info["low_iterations"] == 0 and single.info["polish_steps"] == 0
+    assert_array_equal(single.policy, value_iteration(1e-06, 1, u_grid, beta, history="none").policy)
+
+def test_streamed_kernel(setup_ramsey, setup_ramsey_grid, tmp_path):
+    k_grid, u_grid, beta = setup_ramsey_grid
+    val_old = np.linspace(-1, 1, len(u_grid))
+    fused = fused_bellman_max(feasible_grid(u_grid), val_old, beta)
+    for block_rows in (1, 7, 60):
+        streamed = streamed_bellman_max(u_grid, val_old, beta, block_rows=block_rows)
+        assert_array_equal(streamed[0], fused[0])
+        assert_array_equal(streamed[1], fused[1])
+
+    k_disk, c_disk, u_disk = get_grid(None, 60, **setup_ramsey, path=tmp_path)
+    in_memory = value_iteration(1e-06, 500, u_grid, beta, history="none")
+    on_disk = value_iteration(1e-06, 500, u_disk, beta, history="none")
+    assert on_disk.num_iter == in_memory.num_iter
+    assert_array_equal(on_disk.policy, in_memory.policy)
+    assert_array_equal(on_disk.value, in_memory.value)
+
+    with pytest.raises(ValueError):
+        value_iteration(1e-06, 500, u_disk, beta, dtype=np.float32)
+
+def test_policy_iteration_on_disk(setup_ramsey, setup_ramsey_grid, tmp_path):
+    k_grid, u_grid, beta = setup_ramsey_grid
+    k_disk, c_disk, u_disk = get_grid(0.6, 60, **setup_ramsey, path=tmp_path)
+
+    policy = random_policy(u_disk, seed=0)
+    assert not np.isnan(u_disk[policy, np.arange(60)]).any()
+    assert_array_equal(policy, random_policy(u_disk, seed=0))
+
+    in_memory = policy_iteration(500, np.array(u_disk), beta, history="none", seed=0)
+    on_disk = policy_iteration(500, u_disk, beta, history="none", seed=0)
+    assert_array_equal(on_disk.policy, in_memory.policy)
+    assert_array_almost_equal(on_disk.value, in_memory.value, decimal=10)
+
+    # The warm start streams over the memory-mapped grid as well
+    warm = policy_iteration(500, u_disk, beta, history="none", v0=in_memory.value)
+    assert warm.num_iter == 1
+    assert_array_equal(warm.policy, in_memory.policy)
+
+def test_bellman_equation_transition():
+    rng = np.random.default_rng(0)
+    u_grid, val_old = rng.normal(size=(4, 4, 3)), rng.normal(size=(4, 3))
+    z_grid, transition = rouwenhorst(3, 0.9, 0.02)
+
+    v_bellman = bellman_equation(u_grid, val_old, 0.95, transition)
+    for z in range(3):
+        expected = u_grid[:,:,z] + 0.95*val_old.dot(transition[z])[:,None]
+        assert_array_almost_equal(v_bellman[:,:,z], expected)
+
+def test_stochastic_solvers(setup_ramsey):
+    z_grid, transition = rouwenhorst(3, 0.9, 0.02)
+    k_grid, c_grid, u_grid = get_grid_stochastic(None, 40, np.exp(z_grid), **setup_ramsey)
+    beta = setup_ramsey["beta"]
+
+    value = value_iteration(1e-08, 1000, u_grid, beta, history="none", transition=transition)
+    policy = policy_iteration(500, u_grid, beta, history="none", seed=0, transition=transition)
+    modified = modified_policy_iteration(1e-08, 30, 1000, u_grid, beta, history="none", transition=transition)
+
+    assert value.value.shape == (40, 3)
+    for result in (policy, modified):
+        assert_array_equal(result.policy, value.policy)
+        assert_array_almost_equal(result.value, value.value, decimal=5)
+
+    # Higher productivity never lowers the savings
+    assert np.all(np.diff(value.policy, axis=1) >= 0)
+
+    for kernel in ("dense", "monotone"):
+        with pytest.raises(ValueError):
+            value_iteration(1e-08, 1000, u_grid, beta, kernel=kernel, transition=transition)
+
+def test_stochastic_evaluation_legacy_scipy(setup_ramsey, monkeypatch):
+    from codes import ddp_algorithms
+    from scipy.sparse.linalg import gmres
+
+    def legacy_gmres(A, b, tol=1e-05, atol=None, restart=None):
+        return gmres(A, b, rtol=tol, atol=atol, restart=restart)
+    monkeypatch.setattr(ddp_algorithms, "gmres", legacy_gmres)
+
+    z_grid, transition = rouwenhorst(3, 0.9, 0.02)
+    k_grid, c_grid, u_grid = get_grid_stochastic(None, 20, np.exp(z_grid), **setup_ramsey)
+    policy = np.tile(np.arange(20)[:,None], (1, 3))
+
+    sparse_value = evaluate_policy(policy, u_grid, setup_ramsey["beta"], "sparse", transition=transition)
+    dense_value = evaluate_policy(policy, u_grid, setup_ramsey["beta"], "dense", transition=transition)
+    assert_array_almost_equal(sparse_value, dense_value, decimal=8)
+
+def test_stochastic_without_risk(setup_ramsey_grid):
+    k_grid, u_grid, beta = setup_ramsey_grid
+    deterministic = value_iteration(1e-06, 500, u_grid, beta, history="none")
+
+    # Two identical productivity states reproduce the deterministic model
+    transition = np.full((2, 2), 0.5)
+    result = value_iteration(1e-06, 500, np.stack([u_grid, u_grid], axis=2), beta,
+                             history="none", transition=transition)
+    assert result.num_iter == deterministic.num_iter
+    for z in range(2):
+        assert_array_equal(result.policy[:,z], deterministic.policy)
+        assert_array_almost_equal(result.value[:,z], deterministic.value)
+
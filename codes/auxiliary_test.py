@@ -0,0 +1,99 @@
+import numpy as np
+from numpy.testing import assert_array_almost_equal
+from numpy.testing import assert_array_equal
+
+from codes.ddp_auxiliary import transfer_solution
+from codes.ddp_auxiliary import consumption_grid
+from codes.ddp_auxiliary import consumption_grid_mat
+from codes.ddp_auxiliary import get_grid
+from codes.ddp_auxiliary import linear_solution
+from codes.ddp_auxiliary import consumption_linear_solution
+from codes.ddp_auxiliary import simulate_policy
+from codes.ddp_functions import linearized_dynamic_system
+
+def test_transfer_solution():
+    k_from = np.linspace(1.0, 3.0, 5)
+    k_to = np.linspace(1.0, 3.0, 9)
+    value = 2*k_from
+    policy = np.array([0, 1, 2, 2, 3])
+
+    value_to, policy_to = transfer_solution(k_from, k_to, value, policy)
+    assert_array_almost_equal(value_to, 2*k_to)
+    assert_array_equal(policy_to, [0, 1, 2, 3, 4, 4, 4, 5, 6])
+
+def test_linear_solution(setup_ramsey):
+    capitals, consumptions, A = linearized_dynamic_system(**setup_ramsey)
+    k_grid = np.linspace(0.8, 1.2, 6)*capitals
+
+    k_sim, c_sim = linear_solution(k_grid, 30, **setup_ramsey)
+    assert k_sim.shape == c_sim.shape == (6, 30)
+    assert_array_almost_equal(c_sim[:,0], consumption_linear_solution(k_grid, **setup_ramsey))
+
+    # Step by step recurrence of the linearized system
+    x_t = np.vstack((c_sim[:,0] - consumptions, k_grid - capitals))
+    for t in range(29):
+        x_t[1] = A[1,:].dot(x_t)
+        x_t[0] = (c_sim[:,0] - consumptions)/(k_grid - capitals)*x_t[1]
+        assert_array_almost_equal(k_sim[:,t+1], x_t[1] + capitals)
+        assert_array_almost_equal(c_sim[:,t+1], x_t[0] + consumptions)
+
+def test_simulate_policy():
+    k_grid = np.linspace(1.0, 3.0, 8)
+    # Tail 0 -> 1 -> 2, cycle 2 -> 3 -> 4 -> 2, fixed point 6, tail 7 -> 6
+    policy = np.array([1, 2, 3, 4, 2, 2, 6, 6])
+
+    k_sim, c_sim = simulate_policy(k_grid, policy, 12, 0.3, 0.1)
+    idx = np.empty((8, 12), dtype= int)
+    idx[:,0] = np.arange(8)
+    for t in range(11):
+        idx[:,t+1] = policy[idx[:,t]]
+    assert_array_equal(k_sim, k_grid[idx])
+    assert_array_almost_equal(c_sim, k_sim**0.3 + 0.9*k_sim - k_grid[policy[idx]])
+
+    k_sim, c_sim = simulate_policy(k_grid, policy, 5, 0.3, 0.1, initial=[7, 0])
+    assert_array_equal(k_sim, k_grid[[[7, 6, 6, 6, 6], [0, 1, 2, 3, 4]]])
+
+def test_consumption_grid():
+    k_grid = np.linspace(0.5, 8.0, 40)
+    expected = consumption_grid_mat(k_grid, 0.3, 0.1)
+    expected[expected < 0] = np.nan
+    assert np.any(np.isnan(expected))
+
+    assert_array_equal(consumption_grid(k_grid, 0.3, 0.1), expected)
+    # Unsorted grids fall back to a mask
+    order = np.random.default_rng(0).permutation(40)
+    assert_array_equal(consumption_grid(k_grid[order], 0.3, 0.1), expected[order][:,order])
+
+def test_get_grid_buffers(setup_ramsey):
+    k_grid, c_grid, u_grid = get_grid(None, 30, **setup_ramsey)
+
+    out = (np.empty((30, 30)), np.empty((30, 30)))
+    k_reuse, c_reuse, u_reuse = get_grid(None, 30, **setup_ramsey, out=out)
+    assert c_reuse is out[0] and u_reuse is out[1]
+    assert_array_equal(u_reuse, u_grid)
+
+    k_single, c_single, u_single = get_grid(None, 30, **setup_ramsey, dtype=np.float32)
+    assert u_single.dtype == np.float32
+    np.testing.assert_allclose(u_single, u_grid, rtol=1e-3)
+
+def test_get_grid_on_disk(setup_ramsey, tmp_path):
+    k_grid, c_grid, u_grid = get_grid(None, 30, **setup_ramsey)
+
+    k_disk, c_disk, u_disk = get_grid(None, 30, **setup_ramsey, path=tmp_path)
+    assert isinstance(u_disk, np.memmap)
+    assert_array_equal(c_disk, c_grid)
+    assert_array_equal(u_disk, u_grid)
+
+    # The files are reused as long as the arguments match
+    modified = (tmp_path / "u_grid.npy").stat().st_mtime_ns
+    get_grid(None, 30, **setup_ramsey, path=tmp_path)
+    assert (tmp_path / "u_grid.npy").stat().st_mtime_ns == modified
+
+    k_other, c_other, u_other = get_grid(None, 30, 0.95, 0.3, 0.1, 3, path=tmp_path)
+    assert_array_equal(u_other, get_grid(None, 30, 0.95, 0.3, 0.1, 3)[2])
+
+    # Rebuilding smaller grids leaves the memory maps of the old files intact
+    k_small, c_small, u_small = get_grid(None, np.int64(20), **setup_ramsey, path=tmp_path)
+    assert_array_equal(u_small, get_grid(None, 20, **setup_ramsey)[2])
+    assert_array_equal(u_disk, u_grid)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["c_grid.npy", "grid.json", "u_grid.npy"]
@@ -0,0 +1,43 @@
+import pytest
+import numpy as np
+from numpy.testing import assert_array_almost_equal
+from numpy.testing import assert_array_equal
+
+from codes.ddp_auxiliary import get_grid
+from codes.ddp_algorithms import value_iteration
+from codes.ddp_batch import get_grid_batch
+from codes.ddp_batch import batch_value_iteration
+from codes.ddp_batch import default_chunk
+
+@pytest.fixture
+def setup_parameters():
+    out = {}
+    out["beta"] = np.array([0.9, 0.95, 0.97])
+    out["alpha"] = np.array([0.3, 0.35, 0.4])
+    out["delta"] = 0.1
+    out["sigma"] = np.array([2, 3, 1.5])
+    return out
+
+def test_batch_value_iteration(setup_parameters):
+    k_grids, c_grids, u_grids = get_grid_batch(None, 40, **setup_parameters)
+    values, policies, num_iters = batch_value_iteration(1e-06, 1000, u_grids, setup_parameters["beta"], chunk=2)
+
+    for b in range(3):
+        paras = {key: np.broadcast_to(x, (3,))[b] for key, x in setup_parameters.items()}
+        k_grid, c_grid, u_grid = get_grid(dev = None, num_states = 40, **paras)
+        assert_array_almost_equal(k_grids[b], k_grid)
+
+        value_store_iter, store_policy, num_iter = value_iteration(1e-06, 1000, u_grid, paras["beta"])
+        assert num_iters[b] == num_iter
+        assert_array_equal(policies[b], store_policy[num_iter,:])
+        assert_array_almost_equal(values[b], value_store_iter[num_iter,:], decimal=10)
+
+def test_batch_default_chunk(setup_parameters):
+    assert default_chunk(400, 400) > 1
+    assert default_chunk(40, 40) > 3
+
+    k_grids, c_grids, u_grids = get_grid_batch(None, 40, **setup_parameters)
+    batched = batch_value_iteration(1e-06, 1000, u_grids, setup_parameters["beta"])
+    single = batch_value_iteration(1e-06, 1000, u_grids, setup_parameters["beta"], chunk=1)
+    for default, one in zip(batched, single):
+        assert_array_equal(default, one)
@@ -0,0 +1,65 @@
+import pytest
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from codes.ddp_auxiliary import get_grid
+from codes.ddp_cache import SolutionCache
+from codes.ddp_cache import cache_key
+
+def test_cache_key(setup_ramsey):
+    key = cache_key(kind="grid", num_states=30, **setup_ramsey)
+    assert key == cache_key(kind="grid", num_states=30, **setup_ramsey)
+    assert key != cache_key(kind="grid", num_states=31, **setup_ramsey)
+    assert cache_key(v0=np.zeros(3)) != cache_key(v0=np.ones(3))
+
+def test_cached_grid(setup_ramsey, tmp_path):
+    cache = SolutionCache(tmp_path)
+    k_grid, c_grid, u_grid = get_grid(None, 30, **setup_ramsey)
+
+    for _ in range(2):
+        k_cached, c_cached, u_cached = cache.grid(None, 30, **setup_ramsey)
+        assert_array_equal(u_cached, u_grid)
+    assert cache.stats["grid_hits"] == 1 and cache.stats["grid_misses"] == 1
+
+    k_disk, c_disk, u_disk = cache.grid(None, 30, **setup_ramsey, mmap=True)
+    assert isinstance(u_disk, np.memmap)
+    assert_array_equal(u_disk, u_grid)
+
+@pytest.mark.parametrize("solver", ["value_iteration", "policy_iteration", "modified_policy_iteration"])
+def test_cached_solution(setup_ramsey, tmp_path, solver):
+    cache = SolutionCache(tmp_path)
+    kwargs = {"seed": 0} if solver == "policy_iteration" else {}
+    first = cache.solve(solver, None, 40, **setup_ramsey, crit=1e-06, **kwargs)
+    second = cache.solve(solver, None, 40, **setup_ramsey, crit=1e-06, **kwargs)
+
+    assert cache.stats["solution_hits"] == 1 and cache.stats["solution_misses"] == 1
+    assert cache.stats["grid_hits"] == 0 and cache.stats["grid_misses"] == 1
+    assert second.num_iter == first.num_iter
+    assert_array_equal(second.policy, first.policy)
+    assert_array_equal(second.value, first.value)
+    assert second.info.keys() == first.info.keys()
+
+def test_cache_eviction(setup_ramsey, tmp_path):
+    cache = SolutionCache(tmp_path)
+    cache.grid(None, 30, **setup_ramsey)
+    cache.budget = cache.size()
+
+    # The new entry pushes the least recently used one out
+    cache.grid(None, 31, **setup_ramsey)
+    assert cache.stats["evictions"] == 1
+    assert len(cache.entries()) == 1
+    cache.grid(None, 31, **setup_ramsey)
+    assert cache.stats["grid_hits"] == 1
+
+def test_cache_foreign_files(setup_ramsey, tmp_path):
+    # Files of other programs in the cache directory are not entries
+    (tmp_path / "notes.txt").write_text("keep me")
+    (tmp_path / "results").mkdir()
+    cache = SolutionCache(tmp_path, budget=0)
+    cache.grid(None, 30, **setup_ramsey)
+    cache.grid(None, 31, **setup_ramsey)
+
+    assert cache.stats["evictions"] == 1
+    assert len(cache.entries()) == 1
+    cache.clear()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["notes.txt", "results"]
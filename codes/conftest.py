@@ -0,0 +1,13 @@
+import pytest
+
+from codes.ddp_auxiliary import get_grid
+
+@pytest.fixture
+def setup_ramsey():
+    out = {"beta": 0.95, "alpha": 0.3, "delta": 0.1, "sigma": 2}
+    return out
+
+@pytest.fixture
+def setup_ramsey_grid(setup_ramsey):
+    k_grid, c_grid, u_grid = get_grid(dev = None, num_states = 60, **setup_ramsey)
+    return k_grid, u_grid, setup_ramsey["beta"]
@@ -0,0 +1,57 @@
+import pytest
+import numpy as np
+from numpy.testing import assert_array_almost_equal
+
+from codes.ddp_auxiliary import get_grid
+from codes.ddp_auxiliary import capital_grid
+from codes.ddp_algorithms import value_iteration
+from codes.ddp_continuous import golden_section_max
+from codes.ddp_continuous import continuous_value_iteration
+from codes.ddp_continuous import endogenous_grid_method
+from codes.ddp_continuous import newton_bisection
+from codes.ddp_continuous import time_iteration
+
+def test_golden_section_max():
+    peaks = np.array([-1.0, 0.3, 2.0, 5.0])
+    x_max, f_max = golden_section_max(lambda x: -(x - peaks)**2, np.zeros(4), np.full(4, 4.0))
+    assert_array_almost_equal(x_max, np.clip(peaks, 0, 4), decimal=8)
+    assert_array_almost_equal(f_max, -(x_max - peaks)**2)
+
+def test_continuous_value_iteration(setup_ramsey):
+    k_fine, c_fine, u_fine = get_grid(None, 600, **setup_ramsey)
+    reference = value_iteration(1e-06, 1000, u_fine, setup_ramsey["beta"], history="none")
+
+    k_grid, c_grid, u_grid = get_grid(None, 40, **setup_ramsey)
+    discrete = value_iteration(1e-06, 1000, u_grid, setup_ramsey["beta"], history="none")
+    result = continuous_value_iteration(1e-06, 1000, k_grid, **setup_ramsey)
+
+    expected = np.interp(k_grid, k_fine, reference.value)
+    error = np.max(np.absolute(result.value - expected))
+    assert error < np.max(np.absolute(discrete.value - expected))/10
+    assert_array_almost_equal(result.info["consumption"],
+                              k_grid**0.3 + 0.9*k_grid - result.policy)
+
+def test_endogenous_grid_method(setup_ramsey):
+    k_grid = capital_grid(None, 50, setup_ramsey["beta"], 0.3, 0.1)
+    expected = continuous_value_iteration(1e-08, 2000, k_grid, **setup_ramsey)
+
+    result = endogenous_grid_method(1e-10, 2000, k_grid, **setup_ramsey)
+    assert result.num_iter < expected.num_iter
+    assert_array_almost_equal(result.info["consumption"], expected.info["consumption"], decimal=4)
+    assert_array_almost_equal(result.value, expected.value, decimal=6)
+
+def test_newton_bisection():
+    targets = np.array([0.5, 2.0, 3.9, 7.0])
+    # Decreasing, with a flat part where Newton steps overshoot
+    fun = lambda x: (np.tanh(targets - x), -1/np.cosh(targets - x)**2)
+    assert_array_almost_equal(newton_bisection(fun, np.zeros(4), np.full(4, 4.0)),
+                              np.minimum(targets, 4.0), decimal=10)
+
+def test_time_iteration(setup_ramsey):
+    k_grid = capital_grid(None, 50, setup_ramsey["beta"], 0.3, 0.1)
+    expected = endogenous_grid_method(1e-10, 2000, k_grid, **setup_ramsey)
+
+    result = time_iteration(1e-10, 2000, k_grid, **setup_ramsey)
+    assert_array_almost_equal(result.info["consumption"], expected.info["consumption"], decimal=5)
+    assert result.info["max_euler_error"] < -4
+    assert len(result.info["euler_errors"]) == 49
@@ -6,9 +6,97 @@ Source: [Value Function Iteration as a Solution Method for the Ramsey Model](htt
 
 """
 
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
 import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import spsolve
+from scipy.sparse.linalg import gmres
+
+from codes import ddp_ragged
+from codes.ddp_ragged import RaggedGrid
+
+# Maximization kernels of `v_greedy` and the search used by `monotone_state_wise_max`
+MONOTONE_KERNELS = {"monotone": "scan", "concave": "concave", "binary": "binary"}
+
+def _numba_backend(backend):
+    """
+    Return the `ddp_numba` module for backend="numba", or None for numpy.
+
+    Falls back to numpy with a warning when numba is not installed.
+    """
+    if backend is None or backend == "numpy":
+        return None
+    if backend != "numba":
+        raise ValueError("Unknown backend: {}".format(backend))
+
+    from codes import ddp_numba
+    if not ddp_numba.HAS_NUMBA:
+        warnings.warn("numba is not installed, falling back to the numpy backend")
+        return None
+    return ddp_numba
+
+def _check_transition(transition, jit=None, order=None, kernel=None):
+    """
+    Reject the options that are not implemented for the stochastic model.
+
+    The "dense" kernel counts infeasible actions as 0 and would pick them
+    once the expected values are negative, so it is rejected as well.
+    """
+    if transition is None:
+        return
+    if kernel == "dense" or kernel in MONOTONE_KERNELS:
+        raise ValueError("Kernel {} does not support a transition matrix".format(kernel))
+    if jit is not None:
+        raise ValueError("The numba backend does not support a transition matrix")
+    if order is not None:
+        raise ValueError("Gauss-Seidel sweeps do not support a transition matrix")
+
+def _check_ragged(u_grid, transition=None, order=None, kernel=None):
+    """
+    Reject the options that are not implemented for a `RaggedGrid`
+    """
+    if not isinstance(u_grid, RaggedGrid):
+        return
+    if kernel not in (None, "dense", "fused"):
+        raise ValueError("Kernel {} does not support a RaggedGrid".format(kernel))
+    if transition is not None:
+        raise ValueError("A RaggedGrid does not support a transition matrix")
+    if order is not None:
+        raise ValueError("Gauss-Seidel sweeps do not support a RaggedGrid")
+
+def policy_utility(u_grid, policy):
+    """
+    Utility vector U_policy[i] = u_grid[policy[i], i] of a dense grid, a
+    stochastic grid (with policy[k, z]) or a `RaggedGrid`
+    """
+    policy = np.asarray(policy)
+    if isinstance(u_grid, RaggedGrid):
+        return ddp_ragged.policy_utility(u_grid, policy)
+    return np.take_along_axis(u_grid, policy[None], axis=0)[0]
 
-def bellman_equation(u_grid, val_old, beta):
+def expected_value(value, transition=None):
+    """
+    Expected continuation value E[v(k', z') | z] of every action k' and
+    current shock z, as one matrix product over the shocks.
+
+    Parameters
+    ----------
+    value : array_like(float, ndim=1 or 2)
+        Value function, of length n, or of shape (n, n_z) with
+        value[k, z].
+
+    transition : array_like( 2-dimensional ndarray of shape (n_z, n_z)), optional
+        Markov matrix of the shock, transition[z, z'] = P(z' | z).
+        Without it the model is deterministic and `value` is returned.
+    """
+    if transition is None:
+        return value
+    return value.dot(np.transpose(transition))
+
+def bellman_equation(u_grid, val_old, beta, transition=None, dtype=None):
     """
     Computes and returns the updated
     value function for an old value function `val_old`.
@@ -17,47 +105,304 @@ def bellman_equation(u_grid, val_old, beta):
     Parameters
     ----------
     val_old : array_like(float, ndim=1)
-        Old value function vector, of length n.
+        Old value function vector, of length n, or of shape (n, n_z)
+        with `transition`.
 
     u_grid : array_like( 2-dimensional ndarray of shape (n, n))
-        Utility grid.
+        Utility grid, of shape (n, n, n_z) with `transition`.
+
+    transition : array_like( 2-dimensional ndarray of shape (n_z, n_z)), optional
+        Markov matrix of the productivity shock, see `expected_value`.
+
+    dtype : data-type, optional
+        Type of the computation and of `v_new`, e.g. np.float32, by default
+        the promoted type of the inputs.
 
     Returns
     -------
     v_new : array_like( 2-dimensional ndarray of shape (n, n))
-        Updated utility value grid
+        Updated utility value grid, of the shape of `u_grid`
 
     """
-    v = u_grid + beta*val_old[:,None]
+    v = np.add(u_grid, beta*expected_value(val_old, transition)[:,None], dtype=dtype)
 
     v_new = np.where(np.isnan(u_grid), 0, v)
 
     return v_new
 
-def state_wise_max(u_grid):
+def state_wise_max(u_grid, dtype=None):
     """
     Find the maximum value function and the corresponding policy
     
     Parameters
     ----------
     u_grid : array_like( 2-dimensional ndarray of shape (n, n))
-            Utility grid
+            Utility grid, the maximum is taken over the actions of the
+            first axis, so grids of shape (n, n, n_z) of the stochastic
+            model work the same.
+
+    dtype : data-type, optional
+            Type of `value_fn`, by default the type of `u_grid`.
 
     Returns
     -------
     value_fn : array_like(float, ndim=1)
-            Value function vector, of length n.
+            Value function vector, of length n, or of shape (n, n_z).
 
-    policy : ndarray(float, ndim=2)
-        Transition matrix for `policy`, of shape (n, n).
+    policy : ndarray(int, ndim=1)
+        Policy vector, of the shape of `value_fn`.
     """
     u_new = np.where(np.isnan(u_grid), 0, u_grid)
+    if dtype is not None:
+        u_new = u_new.astype(dtype, copy=False)
 
     value_fn = np.amax(u_new, axis = 0)
     policy = np.argmax(u_new, axis = 0)
     return value_fn, policy
 
-def evaluate_policy(policy, u_grid, beta):
+def feasible_grid(u_grid, dtype=None):
+    """
+    Encode infeasible (NaN) actions of the utility grid as -inf, in a copy
+    of type `dtype` (float64 by default).
+
+    Done once before iterating, so the Bellman step of `fused_bellman_max`
+    needs no `isnan` checks: an infeasible action can never be the maximum.
+    """
+    u_feasible = np.array(u_grid, dtype= dtype or float)
+    u_feasible[np.isnan(u_feasible)] = -np.inf
+    return u_feasible
+
+def fused_bellman_max(u_feasible, val_old, beta, work=None, value_fn=None, policy=None, transition=None):
+    """
+    Bellman update and state-wise maximum in two passes over the grid,
+    writing into preallocated buffers.
+
+    Parameters
+    ----------
+    u_feasible : array_like( 2-dimensional ndarray of shape (n, n))
+            Utility grid from `feasible_grid`
+
+    val_old : array_like(float, ndim=1)
+            Old value function vector, of length n.
+
+    work : ndarray(float, ndim=2), optional
+            Buffer of shape (n, n) for u_feasible + beta*val_old.
+
+    value_fn, policy : ndarray(float/int, ndim=1), optional
+            Output buffers, of length n.
+
+    transition : array_like( 2-dimensional ndarray of shape (n_z, n_z)), optional
+            Markov matrix of the shock. The grid then has shape (n, n, n_z)
+            and the buffers the shape (n, n_z), see `bellman_equation`.
+
+    Returns
+    -------
+    value_fn : array_like(float, ndim=1)
+            Value function vector, of length n.
+
+    policy : ndarray(int, ndim=1)
+        Policy vector, of length n.
+    """
+    state_shape = u_feasible.shape[1:]
+    if work is None:
+        work = np.empty_like(u_feasible)
+    if value_fn is None:
+        value_fn = np.empty(state_shape)
+    if policy is None:
+        policy = np.empty(state_shape, dtype= np.intp)
+
+    np.add(u_feasible, beta*expected_value(val_old, transition)[:,None], out=work)
+    np.argmax(work, axis=0, out=policy)
+    value_fn[...] = np.take_along_axis(work, policy[None], axis=0)[0]
+    return value_fn, policy
+
+def _read_blocks(u_grid, block_rows):
+    """
+    Yield (rows, block) pairs with in-memory copies of the row blocks of
+    `u_grid`, e.g. an `np.memmap`. The next block is read in a background
+    thread while the current one is processed, into one of two buffers.
+    """
+    num_actions = len(u_grid)
+    starts = range(0, num_actions, block_rows)
+    buffers = [np.empty((block_rows,) + u_grid.shape[1:], dtype= u_grid.dtype) for _ in range(2)]
+
+    def read(k):
+        rows = slice(starts[k], min(starts[k] + block_rows, num_actions))
+        block = buffers[k % 2][:rows.stop - rows.start]
+        np.copyto(block, u_grid[rows])
+        return rows, block
+
+    with ThreadPoolExecutor(max_workers=1) as reader:
+        future = reader.submit(read, 0)
+        for k in range(len(starts)):
+            rows, block = future.result()
+            if k + 1 < len(starts):
+                future = reader.submit(read, k + 1)
+            yield rows, block
+
+def streamed_bellman_max(u_grid, val_old, beta, value_fn=None, policy=None, transition=None, block_rows=None):
+    """
+    Bellman update and state-wise maximum streamed over the row blocks
+    of an out-of-core grid, with the next block read ahead.
+
+    Only two blocks of `block_rows` actions are held in memory, about
+    32 MB each by default. Infeasible (NaN) actions are skipped as in
+    `fused_bellman_max`, and the first maximizing action is returned.
+
+    Parameters
+    ----------
+    u_grid : array_like( 2-dimensional ndarray of shape (n, n))
+            Utility grid, typically an `np.memmap` from `get_grid` with `path`.
+            Of shape (n, n, n_z) with `transition`.
+
+    value_fn, policy : ndarray(float/int, ndim=1), optional
+            Output buffers, of length n.
+
+    Returns
+    -------
+    value_fn : array_like(float, ndim=1)
+            Value function vector, of length n.
+
+    policy : ndarray(int, ndim=1)
+        Policy vector, of length n.
+    """
+    state_shape = u_grid.shape[1:]
+    if block_rows is None:
+        block_rows = max(1, 2**22 // int(np.prod(state_shape)))
+    if value_fn is None:
+        value_fn = np.empty(state_shape)
+    if policy is None:
+        policy = np.empty(state_shape, dtype= np.intp)
+
+    cont = beta*expected_value(val_old, transition)
+    value_fn.fill(-np.inf)
+    policy.fill(0)
+    for rows, block in _read_blocks(u_grid, block_rows):
+        block += cont[rows][:,None]
+        np.copyto(block, -np.inf, where=np.isnan(block))
+        arg = np.argmax(block, axis=0)
+        best = np.take_along_axis(block, arg[None], axis=0)[0]
+
+        # Strictly better only, which keeps the first maximizing action
+        better = best > value_fn
+        value_fn[better] = best[better]
+        policy[better] = arg[better] + rows.start
+    return value_fn, policy
+
+def _sweep_order(sweep, num_states):
+    """
+    State order of a Gauss–Seidel sweep, or None for a Jacobi sweep
+    """
+    if sweep is None or (isinstance(sweep, str) and sweep == "jacobi"):
+        return None
+    if isinstance(sweep, str):
+        if sweep != "gauss-seidel":
+            raise ValueError("Unknown sweep: {}".format(sweep))
+        return np.arange(num_states)
+    order = np.asarray(sweep, dtype= np.intp)
+    # Every state is updated exactly once per sweep
+    if order.shape != (num_states,) or not np.array_equal(np.sort(order), np.arange(num_states)):
+        raise ValueError("The sweep order must be a permutation of the states")
+    return order
+
+def gauss_seidel_bellman_max(u_rows, val_old, beta, order, value_fn=None, policy=None):
+    """
+    Bellman update and state-wise maximum as a Gauss–Seidel sweep.
+
+    States are updated one by one in `order`, and every state already
+    sees the values updated earlier in the same sweep.
+
+    Parameters
+    ----------
+    u_rows : array_like( 2-dimensional ndarray of shape (n, n))
+            Transposed utility grid from `feasible_grid`, u_rows[k_state, k_action]
+
+    val_old : array_like(float, ndim=1)
+            Old value function vector, of length n.
+
+    order : array_like(int, ndim=1)
+            Sequence of the states, e.g. from `steady_state_order`
+
+    Returns
+    -------
+    value_fn : array_like(float, ndim=1)
+            Value function vector, of length n.
+
+    policy : ndarray(int, ndim=1)
+        Policy vector, of length n.
+    """
+    num_states = len(val_old)
+    if value_fn is None:
+        value_fn = np.empty(num_states)
+    if policy is None:
+        policy = np.empty(num_states, dtype= np.intp)
+
+    value_fn[:] = val_old
+    for i in order:
+        objective = u_rows[i] + beta*value_fn
+        j = np.argmax(objective)
+        value_fn[i], policy[i] = objective[j], j
+    return value_fn, policy
+
+def iterate_policy(policy, U_policy, value, beta, k, crit, transition=None):
+    """
+    Evaluate a policy approximately by at most k steps of
+    v <- U_policy + beta * v[policy], stopping once the sup-norm change
+    falls below `crit`.
+
+    A deterministic policy moves state i to policy[i] only, so every step
+    is an O(n) gather instead of a mat-vec with the dense Q_policy.
+    With a `transition` matrix the gather picks, for every state (k, z),
+    the row policy[k, z] of `expected_value`.
+
+    Returns
+    -------
+    value : array_like(float, ndim=1)
+            Value function after the last accepted step
+
+    steps : int
+            Number of steps computed
+
+    first_diff, last_diff : float
+            Sup-norm change of the first and the last step
+    """
+    first_diff = last_diff = 0.0
+    step = 0
+    for step in range(1, k + 1):
+        if transition is None:
+            val_new = U_policy + beta*value[policy]
+        else:
+            val_new = U_policy + beta*np.take_along_axis(expected_value(value, transition), policy, axis=0)
+
+        last_diff = np.max(np.absolute(val_new - value))
+        if step == 1:
+            first_diff = last_diff
+        # quit iterations, when convergence is achieved
+        if last_diff < crit:
+            break
+
+        value = val_new
+    return value, step, first_diff, last_diff
+
+def _gauss_seidel_iterate_policy(policy, U_policy, value, beta, k, crit, order):
+    """
+    `iterate_policy` with in-place sweeps of v[i] <- U_policy[i] + beta * v[policy[i]] in `order`
+    """
+    first_diff = last_diff = 0.0
+    step = 0
+    for step in range(1, k + 1):
+        last_diff = 0.0
+        for i in order:
+            v = U_policy[i] + beta*value[policy[i]]
+            last_diff = max(last_diff, abs(v - value[i]))
+            value[i] = v
+        if step == 1:
+            first_diff = last_diff
+        if last_diff < crit:
+            break
+    return value, step, first_diff, last_diff
+
+def evaluate_policy(policy, u_grid, beta, method=None, backend=None, transition=None):
     """
     Computes the updated value function `Tv` for a `policy`.
 
@@ -69,6 +414,25 @@ def evaluate_policy(policy, u_grid, beta):
     u_grid : array_like( 2-dimensional ndarray of shape (n, n))
             Utility grid
 
+    beta : float
+            Discount factor
+
+    method : str, optional
+            Linear solver for (I - beta * Q_policy) v = U_policy.
+            "cycle" (default) solves exactly in O(n) on the functional
+            graph i -> policy[i], see `_evaluate_policy_cycle`;
+            "dense" builds the full n×n system and calls
+            `np.linalg.solve`; "sparse" stores Q_policy in CSR format
+            (one nonzero per row) and uses a sparse direct solver.
+
+    backend : str, optional
+            "numpy" (default) or "numba", used by the "cycle" and "dense" methods.
+
+    transition : array_like( 2-dimensional ndarray of shape (n_z, n_z)), optional
+            Markov matrix of the shock. `policy` and `v_policy` then have
+            shape (n, n_z) and the methods are "sparse" (default) or
+            "dense", see `_evaluate_policy_stochastic`.
+
     U_policy : array_like(float, ndim=1)
             Utility vector corresponding with policy, of length n
     
@@ -81,10 +445,88 @@ def evaluate_policy(policy, u_grid, beta):
         Value function vector, of length n
 
     """
-    num_states = len(u_grid)
+    if transition is not None:
+        if method is None:
+            method = "sparse"
+        if method not in ("sparse", "dense"):
+            raise ValueError("Method {} does not support a transition matrix".format(method))
+        return _evaluate_policy_stochastic(np.asarray(policy), u_grid, beta, transition, method)
+
+    if method is None:
+        method = "cycle"
+
+    if method not in ("cycle", "dense", "sparse"):
+        raise ValueError("Unknown policy evaluation method: {}".format(method))
+
+    jit = _numba_backend(backend)
+    policy = np.asarray(policy)
+    if method == "dense" and jit is not None and not isinstance(u_grid, RaggedGrid):
+        return jit.evaluate_policy(policy, u_grid, beta)
+
+    U_policy = policy_utility(u_grid, policy)
+    if method == "cycle":
+        if jit is not None:
+            return jit.evaluate_policy_cycle(policy, U_policy, beta)
+        return _evaluate_policy_cycle(policy, U_policy, beta)
+    elif method == "dense":
+        return _evaluate_policy_dense(policy, U_policy, beta)
+    else:
+        return _evaluate_policy_sparse(policy, U_policy, beta)
+
+def _evaluate_policy_cycle(policy, U_policy, beta):
+    """
+    Solve v = U_policy + beta * v[policy] exactly in O(n).
+
+    Following i -> policy[i] from any state ends in a cycle; in the Ramsey
+    model the cycle is the steady-state fixed point. On a cycle
+    c_0 -> ... -> c_{L-1} -> c_0 the value is
+        v(c_0) = sum_t beta^t U_policy(c_t) / (1 - beta^L),
+    every other state then follows from v(i) = U_policy(i) + beta * v(policy[i]),
+    starting next to the cycle and walking back along the path.
+    """
+    num_states = len(policy)
+    successor = policy.tolist()
+    utility = U_policy.tolist()
+    value = [0.0]*num_states
+    # 0: not visited, 1: on the current path, 2: value known
+    status = [0]*num_states
+
+    for start in range(num_states):
+        path = []
+        i = start
+        while status[i] == 0:
+            status[i] = 1
+            path.append(i)
+            i = successor[i]
+
+        if status[i] == 1:
+            # The path closed a new cycle at state i
+            first = path.index(i)
+            cycle = path[first:]
+            discounted, discount = 0.0, 1.0
+            for c in cycle:
+                discounted += discount*utility[c]
+                discount *= beta
+            value[i] = discounted/(1 - discount)
+            status[i] = 2
+            # Walk back around the cycle to c_0, then down the tail
+            path = cycle[:0:-1] + path[first - 1::-1] if first else cycle[:0:-1]
+        else:
+            path = path[::-1]
+
+        for c in path:
+            value[c] = utility[c] + beta*value[successor[c]]
+            status[c] = 2
+
+    return np.array(value)
+
+def _evaluate_policy_dense(policy, U_policy, beta):
+    """
+    Solve (I - beta * Q_policy) v = U_policy with dense matrices, O(n^3)
+    """
+    num_states = len(policy)
 
     # Solve (I - beta * Q_policy) v = U_policy
-    U_policy = u_grid[policy,range(len(policy))]
     b = U_policy
 
     Q_policy = np.zeros((num_states, num_states))
@@ -96,13 +538,189 @@ def evaluate_policy(policy, u_grid, beta):
     v_policy = np.linalg.solve(A, b)
     return v_policy
 
-def v_greedy(v, u_grid, beta):
+def _evaluate_policy_sparse(policy, U_policy, beta):
+    """
+    Solve (I - beta * Q_policy) v = U_policy with Q_policy in CSR format.
+
+    A deterministic policy moves state i to exactly one state policy[i],
+    so A has at most two nonzeros per row and O(n) memory.
+    """
+    num_states = len(policy)
+    states = np.arange(num_states)
+
+    # Duplicate (i, i) entries, where policy[i] == i, are summed by scipy
+    rows = np.concatenate((states, states))
+    cols = np.concatenate((states, policy))
+    data = np.concatenate((np.ones(num_states), np.full(num_states, -beta)))
+    A = sparse.csr_matrix((data, (rows, cols)), shape=(num_states, num_states))
+
+    v_policy = spsolve(A, U_policy)
+    return v_policy
+
+def _gmres(A, b, rtol):
+    """
+    `gmres` with the relative tolerance `rtol`, under the keyword of the
+    installed SciPy: `rtol` from 1.12 on, `tol` before
+    """
+    try:
+        return gmres(A, b, rtol=rtol, atol=0.0, restart=50)
+    except TypeError:
+        return gmres(A, b, tol=rtol, atol=0.0, restart=50)
+
+def _evaluate_policy_stochastic(policy, u_grid, beta, transition, method):
+    """
+    Solve (I - beta * Q_policy) v = U_policy on the states (k, z), ordered
+    as k*n_z + z. The row of (k, z) holds the transition probabilities
+    P(z' | z) at the columns (policy[k, z], z'), so Q_policy has n_z
+    nonzeros per row.
+
+    The "sparse" method uses GMRES: a direct factorization of A fills
+    in badly for policies that mix the states, while A is diagonally
+    dominant for beta < 1 and the iteration converges fast.
+    """
+    num_states, num_shocks = policy.shape
+    size = num_states*num_shocks
+    shocks = np.arange(num_shocks)
+
+    U_policy = policy_utility(u_grid, policy)
+
+    cols = (policy[:,:,None]*num_shocks + shocks).ravel()
+    data = np.broadcast_to(transition, (num_states, num_shocks, num_shocks)).ravel()
+    indptr = np.arange(0, size*num_shocks + 1, num_shocks)
+    Q_policy = sparse.csr_matrix((data, cols, indptr), shape=(size, size))
+    A = sparse.identity(size, format="csr") - beta*Q_policy
+
+    if method == "dense":
+        v_policy = np.linalg.solve(A.toarray(), U_policy.ravel())
+    else:
+        v_policy, status = _gmres(A, U_policy.ravel(), 1e-12)
+        if status != 0:
+            v_policy = spsolve(A.tocsc(), U_policy.ravel())
+    return v_policy.reshape(num_states, num_shocks)
+
+def monotone_state_wise_max(u_grid, val_old, beta, search=None):
+    """
+    Bellman update and state-wise maximum exploiting a monotone policy.
+
+    For the Ramsey grid the optimal k' is non-decreasing in k, so the
+    search for state i starts at the optimal action of state i-1.
+    States must be ordered by increasing capital, as in `get_grid`, and
+    the feasible actions of every state must form a prefix of the grid.
+    Infeasible (NaN) actions are never chosen.
+
+    Parameters
+    ----------
+    u_grid : array_like( 2-dimensional ndarray of shape (n, n))
+            Utility grid
+
+    val_old : array_like(float, ndim=1)
+            Old value function vector, of length n.
+
+    beta : float
+            Discount factor
+
+    search : str, optional
+            "scan" (default) takes the maximum over all feasible actions
+            above the lower bound; "concave" walks up from the lower bound
+            and stops at the first decrease of the objective; "binary"
+            uses the binary concavity search of Heer and Maußner (2011).
+
+    Returns
+    -------
+    value_fn : array_like(float, ndim=1)
+            Value function vector, of length n.
+
+    policy : ndarray(int, ndim=1)
+        Policy vector, of length n.
+    """
+    if search is None:
+        search = "scan"
+    if search not in ("scan", "concave", "binary"):
+        raise ValueError("Unknown monotone search: {}".format(search))
+
+    num_actions, num_states = u_grid.shape
+    value_fn = np.empty(num_states)
+    policy = np.empty(num_states, dtype= int)
+    cont = beta*val_old
+
+    def objective(j, i):
+        u = u_grid[j, i]
+        return -np.inf if np.isnan(u) else u + cont[j]
+
+    lower = 0
+    for i in range(num_states):
+        if search == "scan":
+            column = u_grid[lower:, i] + cont[lower:]
+            column[np.isnan(column)] = -np.inf
+            j = lower + int(np.argmax(column))
+            best = column[j - lower]
+
+        elif search == "concave":
+            j, best = lower, objective(lower, i)
+            while j + 1 < num_actions:
+                candidate = objective(j + 1, i)
+                if candidate <= best:
+                    break
+                j, best = j + 1, candidate
+
+        else:
+            # Last feasible action, feasible actions form a prefix
+            a, b = lower, num_actions - 1
+            if np.isnan(u_grid[b, i]):
+                hi = b
+                while hi - a > 1:
+                    mid = (a + hi) // 2
+                    if np.isnan(u_grid[mid, i]):
+                        hi = mid
+                    else:
+                        a = mid
+                a, b = lower, a
+
+            # Bisect the concave objective on [a, b]
+            while b - a > 1:
+                mid = (a + b) // 2
+                if objective(mid, i) < objective(mid + 1, i):
+                    a = mid + 1
+                else:
+                    b = mid
+            f_a, f_b = objective(a, i), objective(b, i)
+            j, best = (a, f_a) if f_a >= f_b else (b, f_b)
+
+        value_fn[i], policy[i] = best, j
+        lower = j
+
+    return value_fn, policy
+
+def v_greedy(v, u_grid, beta, kernel=None, backend=None, transition=None):
     """
     Parameters
     ----------
     v : array_like(float, ndim=1)
         Value function vector, of length n.
 
+    u_grid : array_like( 2-dimensional ndarray of shape (n, n)) or RaggedGrid
+        Utility grid. A `RaggedGrid` of `ddp_ragged` supports the "dense"
+        and "fused" kernels, which then scan the feasible actions only.
+
+    kernel : str, optional
+        Maximization kernel. "fused" (default) uses `fused_bellman_max`,
+        which skips infeasible actions; "dense" scans the full grid with
+        `bellman_equation` and `state_wise_max`, which count infeasible
+        actions as 0; "monotone", "concave" and "binary" use
+        `monotone_state_wise_max` with the corresponding search;
+        "streamed" uses `streamed_bellman_max`, the default for an
+        `np.memmap` grid.
+
+    backend : str, optional
+        "numpy" (default) or "numba" for the compiled kernels of `ddp_numba`.
+
+    transition : array_like( 2-dimensional ndarray of shape (n_z, n_z)), optional
+        Markov matrix of the shock, with `v` of shape (n, n_z) and
+        `u_grid` of shape (n, n, n_z). Supported by the "fused" and
+        "streamed" kernels of the numpy backend; the "dense" kernel raises
+        a ValueError, as counting infeasible actions as 0 can pick them
+        once the expected values are negative.
+
     policy : ndarray(int, ndim=1)
         Optional output array for `sigma`.
     Returns
@@ -110,94 +728,578 @@ def v_greedy(v, u_grid, beta):
     policy : ndarray(int, ndim=1)
         v-greedy policy vector, of length n.
     """
-
-    #improve value function
-    v_new = bellman_equation(u_grid, v, beta)
-    
-    #find the new_policy (new maximum)
-    new_value , new_policy = state_wise_max(v_new)
+    jit = _numba_backend(backend)
+    if isinstance(u_grid, RaggedGrid):
+        _check_ragged(u_grid, transition, kernel=kernel)
+        if jit is None:
+            return ddp_ragged.bellman_max(u_grid, v, beta)
+        new_value, new_policy = np.empty(len(v)), np.empty(len(v), dtype= np.intp)
+        jit.ragged_bellman_max(u_grid.data, u_grid.offsets, v, beta, new_value, new_policy)
+        return new_value, new_policy
+
+    _check_transition(transition, jit, kernel=kernel)
+    if kernel is None and isinstance(u_grid, np.memmap):
+        kernel = "streamed"
+    if kernel is None:
+        kernel = "fused"
+
+    if kernel == "streamed":
+        new_value, new_policy = streamed_bellman_max(u_grid, v, beta, transition=transition)
+    elif jit is not None and (kernel in (None, "dense", "fused") or kernel in MONOTONE_KERNELS):
+        new_value = np.empty(len(v))
+        new_policy = np.empty(len(v), dtype= int)
+        if kernel in MONOTONE_KERNELS:
+            search = jit.SEARCH_CODES[MONOTONE_KERNELS[kernel]]
+            jit.monotone_bellman_max(u_grid, v, beta, search, new_value, new_policy)
+        else:
+            infeasible = 0.0 if kernel == "dense" else -np.inf
+            jit.bellman_max(u_grid, v, beta, new_value, new_policy, infeasible)
+    elif kernel == "dense":
+        #improve value function
+        v_new = bellman_equation(u_grid, v, beta, transition)
+
+        #find the new_policy (new maximum)
+        new_value , new_policy = state_wise_max(v_new)
+    elif kernel == "fused":
+        new_value, new_policy = fused_bellman_max(feasible_grid(u_grid), v, beta, transition=transition)
+    elif kernel in MONOTONE_KERNELS:
+        new_value, new_policy = monotone_state_wise_max(u_grid, v, beta, MONOTONE_KERNELS[kernel])
+    else:
+        raise ValueError("Unknown maximization kernel: {}".format(kernel))
     return new_value, new_policy
 
-def random_policy(_grid):
+def random_policy(_grid, seed=None):
     """
     Randomly choose a policy from plausible choices from grid world
 
     Parameters
     ----------
     c_grid : array_like( 2-dimensional ndarray of shape (n, n))
-        Utility vector, of length n
+        Utility vector, of length n, or of shape (n, n, n_z)
+
+    seed : int, SeedSequence or Generator, optional
+        Seed of a `np.random.default_rng` generator. Without it the
+        global numpy random state is used.
 
     Returns
     -------
     policy : ndarray(int, ndim=1)
-            random policy vector, of length n
+            random policy vector, of length n, or of shape (n, n_z)
     """
+    if isinstance(_grid, RaggedGrid):
+        return ddp_ragged.random_policy(_grid, seed)
+    if isinstance(_grid, np.memmap):
+        return _random_policy_blocks(_grid, seed)
+
     new_grid = np.where(np.isnan(_grid), 0, _grid)
 
-    a = np.transpose(new_grid)
+    a = np.transpose(new_grid.reshape(len(new_grid), -1))
 
-    policy = [np.random.choice(r.nonzero()[0]) for r in a]
+    choice = np.random.choice if seed is None else np.random.default_rng(seed).choice
+    policy = [choice(r.nonzero()[0]) for r in a]
 
+    if new_grid.ndim > 2:
+        policy = np.reshape(policy, new_grid.shape[1:])
+    return policy
+
+def _random_policy_blocks(_grid, seed=None):
+    """
+    `random_policy` for an out-of-core grid, in two passes over its row
+    blocks: the first counts the plausible actions of every state, the
+    second finds the randomly drawn one among them
+    """
+    state_shape = _grid.shape[1:]
+    block_rows = max(1, 2**22 // int(np.prod(state_shape)))
+
+    counts = np.zeros(state_shape, dtype= np.intp)
+    for rows, block in _read_blocks(_grid, block_rows):
+        counts += np.count_nonzero((block != 0) & ~np.isnan(block), axis=0)
+
+    if seed is None:
+        draw = np.random.randint(0, counts)
+    else:
+        draw = np.random.default_rng(seed).integers(0, counts)
+
+    policy = np.zeros(state_shape, dtype= np.intp)
+    seen = np.zeros(state_shape, dtype= np.intp)
+    for rows, block in _read_blocks(_grid, block_rows):
+        plausible = (block != 0) & ~np.isnan(block)
+        hit = plausible & (np.cumsum(plausible, axis=0) + seen == draw + 1)
+        found = hit.any(axis=0)
+        policy[found] = rows.start + np.argmax(hit, axis=0)[found]
+        seen += np.count_nonzero(plausible, axis=0)
     return policy
 
-def value_iteration(crit, max_iter, u_grid, beta):
+class IterationHistory:
+    """
+    Storage for the value functions and policies visited by a solver.
+
+    Parameters
+    ----------
+    mode : str or tuple
+        "none"          keep nothing, only the final solution is returned
+        "full"          keep every iteration
+        ("last", k)     ring buffer with the k most recent iterations
+        ("every", m)    snapshot of every m-th iteration
+        "legacy"        preallocated `max_iter × n` arrays, as returned
+                        by the solvers when no history mode is requested
+
+    max_iter : int
+        Maximum number of iterations of the solver.
+
+    num_states : int or tuple
+        Length of the value function and policy vectors, or their shape,
+        e.g. (n, n_z) in the stochastic model.
+
+    policy_dtype : dtype, optional
+        Type of the stored policies, int (grid indices) by default.
+    """
+
+    def __init__(self, mode, max_iter, num_states, policy_dtype=int):
+        if isinstance(mode, tuple):
+            mode, size = mode
+        else:
+            size = None
+
+        if mode not in ("none", "full", "last", "every", "legacy"):
+            raise ValueError("Unknown history mode: {}".format(mode))
+        if mode in ("last", "every") and (size is None or size < 1):
+            raise ValueError("History mode {} needs a positive size".format(mode))
+
+        self.mode = mode
+        self.size = size
+        self.policy_dtype = policy_dtype
+        state_shape = tuple(np.atleast_1d(num_states))
+
+        if mode == "legacy":
+            self._values = np.full((max_iter,) + state_shape, np.nan)
+            self._policies = np.zeros((max_iter,) + state_shape, dtype= policy_dtype)
+        elif mode == "last":
+            self._values = np.full((size,) + state_shape, np.nan)
+            self._policies = np.zeros((size,) + state_shape, dtype= policy_dtype)
+            self._iterations = np.full(size, -1)
+        else:
+            self._values, self._policies, self._iterations = [], [], []
+
+    def record(self, i, value, policy):
+        """
+        Store the value function and policy of iteration `i`
+        """
+        if self.mode == "legacy":
+            self._values[i,:] = value
+            self._policies[i,:] = policy
+        elif self.mode == "last":
+            slot = i % self.size
+            self._values[slot,:] = value
+            self._policies[slot,:] = policy
+            self._iterations[slot] = i
+        elif self.mode == "full" or (self.mode == "every" and i % self.size == 0):
+            self._values.append(np.array(value))
+            self._policies.append(np.array(policy))
+            self._iterations.append(i)
+
+    @property
+    def iterations(self):
+        """Iteration numbers of the stored rows, in increasing order"""
+        if self.mode == "legacy":
+            return np.arange(len(self._values))
+        if self.mode == "last":
+            return np.sort(self._iterations[self._iterations >= 0])
+        return np.array(self._iterations, dtype= int)
+
+    @property
+    def values(self):
+        """Stored value functions, one row per entry of `iterations`"""
+        if self.mode == "legacy":
+            return self._values
+        if self.mode == "last":
+            return self._values[self._ring_order()]
+        return np.array(self._values)
+
+    @property
+    def policies(self):
+        """Stored policies, one row per entry of `iterations`"""
+        if self.mode == "legacy":
+            return self._policies
+        if self.mode == "last":
+            return self._policies[self._ring_order()]
+        return np.array(self._policies, dtype= self.policy_dtype)
+
+    def _ring_order(self):
+        used = np.nonzero(self._iterations >= 0)[0]
+        return used[np.argsort(self._iterations[used])]
+
+class DPResult:
+    """
+    Compact solution of a dynamic programming solver.
+
+    Attributes
+    ----------
+    value : array_like(float, ndim=1)
+        Final value function, of length n.
+
+    policy : ndarray(int, ndim=1)
+        Final policy vector, of length n.
+
+    num_iter : int
+        Number of iterations, counted as in the legacy return values.
+
+    iterations, value_history, policy_history : ndarray
+        Iteration numbers and the value functions and policies kept
+        by the requested history mode.
+
+    info : dict
+        Solver specific diagnostics.
+    """
+
+    def __init__(self, value, policy, num_iter, history, info=None):
+        self.value = value
+        self.policy = np.asarray(policy)
+        self.num_iter = num_iter
+        self.iterations = history.iterations
+        self.value_history = history.values
+        self.policy_history = history.policies
+        self.info = {} if info is None else info
+
+    def __repr__(self):
+        return "DPResult(num_iter={}, num_states={}, stored={})".format(
+            self.num_iter, len(self.value), len(self.iterations))
+
+def _solver_output(history, value, policy, num_iter, info=None):
+    """
+    Return the legacy (value_store_iter, store_policy, num_iter) tuple,
+    or a `DPResult` when the caller asked for a history mode.
+    """
+    if history.mode == "legacy":
+        return history.values, history.policies, num_iter
+    return DPResult(value, policy, num_iter, history, info)
+
+def _initial_value(u_grid, beta, v0, policy0, backend=None, transition=None):
+    """
+    Initial value function of a solver: `v0`, else the value of `policy0`,
+    else None
+    """
+    if v0 is not None:
+        return np.array(v0, dtype= float)
+    if policy0 is not None:
+        return evaluate_policy(np.asarray(policy0), u_grid, beta, backend=backend, transition=transition)
+    return None
+
+class AndersonAcceleration:
+    """
+    Anderson acceleration (type II) of the fixed-point iteration v = T(v).
+
+    The next iterate mixes the last `depth` Bellman updates with the
+    weights that minimize the linearized residual. The memory restarts
+    whenever the residual grows, which keeps the iteration stable at the
+    kinks of the max operator.
+    """
+
+    def __init__(self, depth=None):
+        self.depth = 5 if depth is None else depth
+        self._dF, self._dG = [], []
+        self._f, self._g = None, None
+
+    def update(self, v, Tv):
+        """
+        Return the next iterate given the current one and its Bellman update
+        """
+        shape = np.shape(Tv)
+        v, Tv = np.ravel(v), np.ravel(Tv)
+        f = Tv - v
+        if self._f is not None:
+            if np.max(np.absolute(f)) > np.max(np.absolute(self._f)):
+                self._dF, self._dG = [], []
+            else:
+                self._dF.append(f - self._f)
+                self._dG.append(Tv - self._g)
+                if len(self._dF) > self.depth:
+                    self._dF.pop(0)
+                    self._dG.pop(0)
+        self._f, self._g = f, np.array(Tv)
+
+        if not self._dF:
+            return np.array(Tv).reshape(shape)
+        gamma = np.linalg.lstsq(np.column_stack(self._dF), f, rcond=None)[0]
+        return (Tv - np.column_stack(self._dG).dot(gamma)).reshape(shape)
+
+def _low_precision_iterations(crit, max_iter, u_grid, beta, val_old, store, dtype, transition=None):
+    """
+    Value iterations of the fused kernel in the floating type `dtype`, the
+    first phase of the mixed-precision mode of `value_iteration`.
+
+    Iterates until the sup-norm change falls below `crit` or below the
+    rounding noise of `dtype`, 16 eps*max|v|, whichever comes first.
+    Returns the value function, the policy and the number of iterations.
+    """
+    resolution = 16*np.finfo(dtype).eps
+    u_low = feasible_grid(u_grid, dtype)
+    work = np.empty_like(u_low)
+    state_shape = u_low.shape[1:]
+    val_old = np.array(val_old, dtype= dtype)
+    val_new = np.empty(state_shape, dtype= dtype)
+    policy = np.empty(state_shape, dtype= np.intp)
+    beta_low = np.asarray(beta, dtype= dtype)
+
+    num_iter = 0
+    while num_iter < max_iter:
+        val_new, policy = fused_bellman_max(u_low, val_old, beta_low, work, val_new, policy, transition)
+        store.record(num_iter, val_new, policy)
+        num_iter += 1
+
+        max_diff = np.max(np.absolute(val_new - val_old))
+        if max_diff < max(crit, resolution*np.max(np.absolute(val_new))):
+            break
+        val_old, val_new = val_new, val_old
+
+    return val_new.astype(float), policy.copy(), num_iter
+
+def value_iteration(crit, max_iter, u_grid, beta, history=None, kernel=None, backend=None, v0=None, policy0=None,
+                    accel=None, sweep=None, transition=None, dtype=None):
     """
     Solve the optimization problem by value iteration.
 
+    Without `history` the full (value_store_iter, store_policy, num_iter)
+    arrays of shape (max_iter, n) are returned. Passing a history mode of
+    `IterationHistory` ("none", "full", ("last", k), ("every", m)) keeps
+    only the requested iterations and returns a `DPResult`.
+
+    `kernel` selects the maximization step of `v_greedy`, `backend`
+    ("numpy" or "numba") the implementation of the compute kernels.
+    The default "fused" kernel encodes infeasible actions once with
+    `feasible_grid` and reuses its buffers across iterations. For an
+    `np.memmap` grid, e.g. from `get_grid` with `path`, the default is the
+    "streamed" kernel, which reads the grid block by block from disk.
+
+    `v0` is the initial value function, zeros by default. Without `v0`,
+    the value of a feasible `policy0` is used instead. See
+    `transfer_solution` in `ddp_auxiliary` to reuse a solution from
+    another capital grid.
+
+    `accel` selects a convergence accelerator:
+        "mqp"       stop on the MacQueen–Porteus bounds, i.e. when the span
+                    of Tv - v is below `crit`, and return the extrapolated
+                    value at the middle of the bounds
+        "relative"  relative value iteration, v is normalized by its value
+                    at the first state after every update; stopping and
+                    extrapolation as "mqp"
+        "anderson"  Anderson acceleration of depth 5, stops on the sup-norm
+    The bound on the sup-norm distance of the returned value function to
+    the fixed point is reported as `info["error_bound"]` of the `DPResult`.
+
+    `sweep` is "jacobi" (default), "gauss-seidel" or an array with the
+    order of the states, e.g. `steady_state_order` of `ddp_auxiliary`.
+    Gauss–Seidel sweeps use the values updated earlier in the same sweep
+    (see `gauss_seidel_bellman_max`); `kernel` and `accel` apply to the
+    Jacobi sweep only.
+
+    `transition` is the Markov matrix of a productivity shock, e.g. from
+    `tauchen` or `rouwenhorst` of `ddp_functions`, with `u_grid` of shape
+    (n, n, n_z) from `get_grid_stochastic`. Values and policies then have
+    shape (n, n_z) and the expectation is one matrix product per
+    iteration, see `expected_value`. The numba backend, Gauss–Seidel
+    sweeps and the "dense" and monotone kernels are not supported.
+
+    `u_grid` may also be a `RaggedGrid` of `ddp_ragged`, which stores the
+    feasible actions only; the Jacobi sweep then runs on its compact
+    layout, with the numpy or the numba backend.
+
+    `dtype` enables the mixed-precision mode, e.g. dtype=np.float32: the
+    bulk of the iterations run with the fused kernel on a float32 copy of
+    the grid, which halves the memory traffic of the Bellman step, until
+    the change of the value function reaches `crit` or the float32
+    rounding noise. The solution is then polished in float64: policy
+    iteration from the float32 policy until it is stable, followed by
+    float64 value iterations down to `crit`. The policy is the float64
+    policy of `u_grid` (pass a float64 grid for this), the value function
+    its exact value. The `info` of the `DPResult` reports the iterations
+    and the time of both phases, the time saved against float64
+    iterations throughout (estimated from the float64 Bellman steps of
+    the polish) and the number of states whose policy the polish changed.
+    Not supported with the numba backend, Gauss–Seidel sweeps, a
+    `RaggedGrid` or an `np.memmap` grid, which the float32 copy would
+    load into memory.
+
     """
     if crit is None:
         crit = 1e-06
+
+    if kernel is None:
+        kernel = "streamed" if isinstance(u_grid, np.memmap) else "fused"
+
+    if accel not in (None, "mqp", "relative", "anderson"):
+        raise ValueError("Unknown accelerator: {}".format(accel))
+    if accel == "anderson":
+        mixer = AndersonAcceleration()
+
+    order = _sweep_order(sweep, len(u_grid))
+    if order is not None and accel is not None:
+        raise ValueError("Accelerators need the Jacobi sweep")
+
+    jit = _numba_backend(backend)
+    _check_transition(transition, jit, order, kernel)
+    _check_ragged(u_grid, transition, order, kernel)
+    ragged = isinstance(u_grid, RaggedGrid)
+    mixed = dtype is not None and np.dtype(dtype) != np.float64
+    if mixed and (jit is not None or order is not None or ragged or isinstance(u_grid, np.memmap)):
+        raise ValueError("The mixed-precision mode needs the numpy backend, the Jacobi sweep and "
+                         "a dense grid in memory")
     
-    num_states = len(u_grid)
+    state_shape = u_grid.shape[1:]
 
     # set up
-    value_store_iter = np.tile(np.nan, [max_iter, num_states])
-    store_policy = np.zeros((max_iter, num_states), dtype= int)
-    val_old, val_new = np.zeros(num_states), np.zeros(num_states)
-
-    for i in range(max_iter):
-        v_new = bellman_equation(u_grid, val_old, beta)
-        val_new, store_policy[i,:] = state_wise_max(v_new)
-        
-        max_diff = np.max(np.absolute(val_new - val_old))
+    store = IterationHistory(history or "legacy", max_iter, state_shape)
+    val_old, val_new = np.zeros(state_shape), np.zeros(state_shape)
+    v0 = _initial_value(u_grid, beta, v0, policy0, backend, transition)
+    if v0 is not None:
+        val_old[...] = v0
+
+    # Bulk of the iterations in low precision
+    first = 0
+    if mixed:
+        start = perf_counter()
+        _, low_policy, first = _low_precision_iterations(
+            crit, max_iter - 1, u_grid, beta, val_old, store, dtype, transition)
+        time_low = perf_counter() - start
+
+    fused = kernel == "fused" and jit is None and order is None and not ragged
+    if ragged and jit is None:
+        work = np.empty(len(u_grid.data))
+    if fused:
+        u_feasible = feasible_grid(u_grid)
+        work = np.empty_like(u_feasible)
+    if order is not None and jit is None:
+        u_rows = feasible_grid(u_grid).T.copy()
+    policy = np.empty(state_shape, dtype= np.intp)
+
+    if mixed:
+        # Polish by policy iteration in float64 from the low-precision
+        # policy: the exact values are free of the rounding noise of the
+        # low-precision ones, which would otherwise decide near-ties
+        start = perf_counter()
+        time_bellman = 0.0
+        polish_steps = 0
+        # Without low-precision iterations there is no policy to polish
+        if first > 0:
+            policy[...] = low_policy
+            for polish_steps in range(1, max_iter):
+                val_old[...] = evaluate_policy(policy, u_grid, beta, transition=transition)
+                step = perf_counter()
+                if fused:
+                    _, improved = fused_bellman_max(u_feasible, val_old, beta, work, val_new, transition=transition)
+                else:
+                    _, improved = v_greedy(val_old, u_grid, beta, kernel, backend, transition)
+                time_bellman += perf_counter() - step
+                if np.array_equal(improved, policy):
+                    break
+                policy[...] = improved
+
+    for i in range(first, max_iter):
+        if order is not None:
+            if jit is not None:
+                val_new[:] = val_old
+                jit.gauss_seidel_bellman_max(u_grid, val_new, beta, order, policy)
+            else:
+                gauss_seidel_bellman_max(u_rows, val_old, beta, order, val_new, policy)
+        elif ragged and jit is None:
+            val_new, policy = ddp_ragged.bellman_max(u_grid, val_old, beta, work, val_new, policy)
+        elif fused:
+            val_new, policy = fused_bellman_max(u_feasible, val_old, beta, work, val_new, policy, transition)
+        else:
+            val_new, policy = v_greedy(val_old, u_grid, beta, kernel, backend, transition)
+        store.record(i, val_new, policy)
+
+        diff = val_new - val_old
+        lower, upper = np.min(diff), np.max(diff)
+        if accel in ("mqp", "relative"):
+            max_diff = upper - lower
+        else:
+            max_diff = max(-lower, upper)
         # quit iterations, when convergence is achieved
         if max_diff < crit:
             break
 
-        value_store_iter[i,:] = val_new
-        val_old = val_new
+        if accel == "anderson":
+            val_old = mixer.update(val_old, val_new)
+            continue
+        if accel == "relative":
+            val_new -= val_new.flat[0]
+        val_old, val_new = val_new, val_old
 
     num_iter = i
 
-    return value_store_iter, store_policy, num_iter
-
-def policy_iteration(max_iter, u_grid, beta):
+    # MacQueen–Porteus bounds: Tv + beta/(1-beta)*[min(Tv - v), max(Tv - v)]
+    factor = beta/(1 - beta)
+    if accel in ("mqp", "relative"):
+        value = val_new + factor*(lower + upper)/2
+        error_bound = factor*(upper - lower)/2
+    else:
+        value = val_new
+        error_bound = factor*max(-lower, upper)
+
+    info = {"accel": accel, "error_bound": error_bound}
+    if mixed:
+        # The low-precision iterations would have taken the time of the
+        # float64 Bellman steps of the polish each
+        time_polish = perf_counter() - start
+        time_saved = first*time_bellman/max(polish_steps, 1) - time_low - time_polish
+        info.update({"dtype": np.dtype(dtype).name, "low_iterations": first,
+                     "polish_steps": polish_steps, "time_low": time_low,
+                     "time_polish": time_polish, "time_saved": time_saved,
+                     "policy_changes": int(np.sum(policy != low_policy)) if first > 0 else 0})
+    return _solver_output(store, value, policy, num_iter, info)
+
+def policy_iteration(max_iter, u_grid, beta, evaluation=None, history=None, backend=None, seed=None,
+                     v0=None, policy0=None, transition=None):
     """
     Solve the optimization problem by policy iteration
 
     Note: matrix Q with zeros everywhere except for its row i and column j elements, which equal one
 
+    `evaluation` selects the policy evaluation method passed to
+    `evaluate_policy`: "cycle" (default, exact and O(n)), "sparse" or "dense".
+    `history` and `backend` work as in `value_iteration`, `seed` is
+    passed to `random_policy`.
+
+    The initial policy is a feasible `policy0`, else the v0-greedy policy
+    when `v0` is given, else a random policy.
+
+    `transition` works as in `value_iteration`; the policies are then
+    evaluated with the "sparse" method by default.
+
     """
-    num_states = len(u_grid)
+    _check_transition(transition, _numba_backend(backend))
+    _check_ragged(u_grid, transition)
+    fused = _numba_backend(backend) is None and not isinstance(u_grid, (RaggedGrid, np.memmap))
+    if fused:
+        u_feasible = feasible_grid(u_grid)
+        work = np.empty_like(u_feasible)
 
     # set up
-    value_store_iter = np.tile(np.nan, [max_iter, num_states])
-    #store_policy = np.tile(np.nan, [max_iter, num_states])
-    store_policy = np.zeros((max_iter, num_states), dtype= int)
+    store = IterationHistory(history or "legacy", max_iter, u_grid.shape[1:])
 
-    # Initialize with a random policy and initial value function
-    policy = random_policy(u_grid)
-    v_policy = evaluate_policy(policy, u_grid, beta)
+    # Initialize with a policy and initial value function
+    if policy0 is not None:
+        policy = np.asarray(policy0)
+    elif v0 is not None:
+        _, policy = v_greedy(np.asarray(v0, dtype= float), u_grid, beta, None, backend, transition)
+    else:
+        policy = random_policy(u_grid, seed)
+    v_policy = evaluate_policy(policy, u_grid, beta, evaluation, backend, transition)
 
     for i in range(max_iter):
         # Policy improvement
-        improved_value , improved_policy = v_greedy(v_policy, u_grid, beta)
+        if fused:
+            improved_value , improved_policy = fused_bellman_max(u_feasible, v_policy, beta, work,
+                                                                 transition=transition)
+        else:
+            improved_value , improved_policy = v_greedy(v_policy, u_grid, beta, backend=backend,
+                                                        transition=transition)
     
         # Policy evaluation
-        Tv = evaluate_policy(improved_policy, u_grid, beta)
+        Tv = evaluate_policy(improved_policy, u_grid, beta, evaluation, backend, transition)
 
-        store_policy[i+1,:] = improved_policy
-        value_store_iter[i+1,:] = improved_value
+        store.record(i+1, improved_value, improved_policy)
 
         # quit iterations, when convergence is achieved
         if np.array_equal(improved_policy, policy):
@@ -208,12 +1310,28 @@ def policy_iteration(max_iter, u_grid, beta):
 
     num_iter = i + 1
 
-    return value_store_iter, store_policy, num_iter
+    return _solver_output(store, Tv, improved_policy, num_iter)
 
-def modified_policy_iteration(crit, k, max_iter, u_grid, beta):
+def modified_policy_iteration(crit, k, max_iter, u_grid, beta, history=None, backend=None,
+                              v0=None, policy0=None, sweep=None, adaptive=False, transition=None):
     """
     Solve the optimization problem by policy iteration
 
+    Every policy improvement is followed by at most k steps of
+    `iterate_policy`. With `adaptive`, the number of steps is chosen
+    before every evaluation from the contraction rate observed in the last
+    one, so that the evaluation halves the change of the improvement step
+    (or reaches `crit`); k is then the upper bound of the schedule.
+
+    `history`, `backend`, `v0`, `policy0`, `sweep` and `transition` work
+    as in `value_iteration`, and `u_grid` may be a `RaggedGrid`. A Gauss–Seidel `sweep` is used in both the policy
+    improvement and the k evaluation steps.
+
+    `num_iter` counts the policy improvements before convergence, as in
+    `value_iteration`. The `DPResult` info holds the total number of
+    evaluation steps, the steps planned at every iteration and the time
+    spent in improvement and evaluation.
+
     """
     if k is None:
         k = 30
@@ -222,50 +1340,88 @@ def modified_policy_iteration(crit, k, max_iter, u_grid, beta):
         crit = 1e-06
 
     num_states = len(u_grid)
+    jit = _numba_backend(backend)
+    order = _sweep_order(sweep, num_states)
+    _check_transition(transition, jit, order)
+    _check_ragged(u_grid, transition, order)
+    if order is not None and jit is None:
+        u_rows = feasible_grid(u_grid).T.copy()
+    fused = jit is None and order is None and not isinstance(u_grid, (RaggedGrid, np.memmap))
+    if fused:
+        u_feasible = feasible_grid(u_grid)
+        work = np.empty_like(u_feasible)
 
     # Set up
-    val_old, val_new = np.zeros(num_states), np.zeros(num_states)
-    store_policy = np.zeros((max_iter, num_states), dtype= int)
-    value_store_iter = np.tile(np.nan, [max_iter, num_states])
+    val_old = np.zeros(u_grid.shape[1:])
+    store = IterationHistory(history or "legacy", max_iter, u_grid.shape[1:])
+    v0 = _initial_value(u_grid, beta, v0, policy0, backend, transition)
+    if v0 is not None:
+        val_old[...] = v0
+
+    rate = beta
+    eval_steps, schedule = 0, []
+    time_improve = time_evaluate = 0.0
 
     for i in range(max_iter):
+        start = perf_counter()
         # Policy improvement
-        improved_value, improved_policy = v_greedy(val_old, u_grid, beta)
+        if fused:
+            improved_value, improved_policy = fused_bellman_max(u_feasible, val_old, beta, work,
+                                                                transition=transition)
+        elif order is None:
+            improved_value, improved_policy = v_greedy(val_old, u_grid, beta, backend=backend,
+                                                       transition=transition)
+        elif jit is not None:
+            improved_value, improved_policy = np.array(val_old), np.empty(num_states, dtype= np.intp)
+            jit.gauss_seidel_bellman_max(u_grid, improved_value, beta, order, improved_policy)
+        else:
+            improved_value, improved_policy = gauss_seidel_bellman_max(u_rows, val_old, beta, order)
+        time_improve += perf_counter() - start
 
         max_diff = np.max(np.absolute(val_old - improved_value))
         # quit iterations, when convergence is achieved
         if max_diff < crit:
+            store.record(i, improved_value, improved_policy)
             break
 
-        Q_policy = np.zeros((num_states, num_states))
-        Q_policy[range(len(improved_policy)),improved_policy] = 1.0
-
-        U_policy = u_grid[improved_policy,range(len(improved_policy))]
+        start = perf_counter()
+        steps = k
+        if adaptive:
+            target = max(crit, 0.5*max_diff)
+            steps = int(np.clip(np.ceil(np.log(target/max_diff)/np.log(rate)), 1, k))
+        schedule.append(steps)
+
+        # Policy evaluation with at most `steps` iterations
+        if jit is not None and not isinstance(u_grid, RaggedGrid):
+            U_policy = jit.policy_utility(improved_policy, u_grid)
+        else:
+            U_policy = policy_utility(u_grid, improved_policy)
+
+        if jit is not None and order is not None:
+            evaluation = jit.gauss_seidel_iterate_policy(
+                improved_policy, U_policy, improved_value, beta, steps, crit, order)
+        elif jit is not None:
+            evaluation = jit.iterate_policy(improved_policy, U_policy, improved_value, beta, steps, crit)
+        elif order is not None:
+            evaluation = _gauss_seidel_iterate_policy(
+                improved_policy, U_policy, improved_value, beta, steps, crit, order)
+        else:
+            evaluation = iterate_policy(improved_policy, U_policy, improved_value, beta, steps, crit, transition)
+        improved_value, done, first_diff, last_diff = evaluation
+
+        # Observed contraction rate per evaluation step
+        if done > 1 and 0 < last_diff < first_diff:
+            rate = min((last_diff/first_diff)**(1/(done - 1)), beta)
+        eval_steps += done
+        time_evaluate += perf_counter() - start
 
-        # Policy evaluation with k iterations
-        for _ in range(k):
-            val_new = U_policy + beta * Q_policy.dot(improved_value)
-                
-            max_diff = np.max(np.absolute(val_new - improved_value))
-            # quit iterations, when convergence is achieved
-            if max_diff < crit:
-                break
-
-            improved_value = val_new
-            
         val_old = improved_value
             
         #update policy
-        store_policy[i,:] = improved_policy
-        value_store_iter[i,:] = improved_value
-
-    num_iter = i - 1
-
-    return value_store_iter, store_policy, num_iter
-
-
-
-
-
+        store.record(i, improved_value, improved_policy)
 
+    num_iter = i
 
+    info = {"eval_steps": eval_steps, "k_schedule": schedule,
+            "time_improve": time_improve, "time_evaluate": time_evaluate}
+    return _solver_output(store, improved_value, improved_policy, num_iter, info)
@@ -1,4 +1,7 @@
 
+import json
+import os
+
 import numpy as np
 
 from codes.ddp_functions import crra
@@ -8,33 +11,74 @@ from codes.ddp_functions import linearized_dynamic_system
 
 def consumption_grid_mat(k_grid,alpha,delta):
     """
-    Calculate the consumption grid based on mp.matrix k_grid
+    Calculate the consumption grid c[k_action, k_state] by broadcasting,
+    negative consumption included. See `consumption_grid` for the masked grid.
+    """
+    k_grid = np.asarray(k_grid)
+    return np.power(k_grid, alpha) + (1 - delta)*k_grid - k_grid[:,None]
+
+def feasible_limits(k_grid, alpha, delta):
+    """
+    Number of feasible actions of every state: for increasing `k_grid`,
+    consumption is non-negative exactly for the actions j < limits[i]
     """
-    k_state = np.matrix(k_grid)
-    k_action = np.transpose(k_state)
-    c = np.power(k_state, alpha) + (1 - delta)*k_state - k_action
-    c_grid = np.asarray(c)
-    return c_grid
+    wealth = np.power(k_grid, alpha) + (1 - delta)*k_grid
+    return np.searchsorted(k_grid, wealth, side="right")
 
-def consumption_grid(k_grid,alpha,delta):
+def _grid_blocks(k_grid, alpha, delta, out):
     """
-    Calculate the consumption grid based on looping np.array k_grid
+    Output buffer of the grid engine and its row blocks
+
+    Yields (rows, c_block) pairs, where c_block = out[rows] holds the
+    consumption of the actions `rows` with NaN where it is negative.
+    Consumption falls with k_action, so the infeasible actions of every
+    state are the tail beyond `feasible_limits`: row j is infeasible for a
+    prefix of the states, which is masked without a boolean n×n mask.
     """
+    k_grid = np.asarray(k_grid)
     num_states = len(k_grid)
-    c_grid = np.tile(np.nan, [num_states, num_states])
-    for i, k_state in enumerate(k_grid):
-        for j, k_action in enumerate(k_grid):
-            c = np.power(k_state, alpha) + (1 - delta)*k_state - k_action
-    if c > 0:
-        c_grid[j, i] = c
-    return c_grid
+    wealth = np.power(k_grid, alpha) + (1 - delta)*k_grid
+
+    sorted_grid = np.all(np.diff(k_grid) > 0)
+    if sorted_grid:
+        first = np.searchsorted(feasible_limits(k_grid, alpha, delta), np.arange(num_states), side="right")
 
+    # Blocks of about 256k cells stay in cache between the passes
+    block = max(1, 2**18 // max(num_states, 1))
+    for start in range(0, num_states, block):
+        rows = slice(start, min(start + block, num_states))
+        c_block = out[rows]
+        np.subtract(wealth, k_grid[rows,None], out=c_block)
+        if sorted_grid:
+            for j in np.nonzero(first[rows])[0]:
+                c_block[j,:first[start + j]] = np.nan
+        else:
+            c_block[c_block < 0] = np.nan
+        yield rows, c_block
 
-def get_grid(dev, num_states, beta, alpha, delta, sigma):
+def consumption_grid(k_grid, alpha, delta, out=None, dtype=None):
     """
-    Create capital, consumption and utility grid 
-    by moving from some K_state (today) to some K_action (next period)
-   
+    Calculate the consumption grid c[k_action, k_state] of moving from
+    k_state (today) to k_action (next period), NaN where consumption is
+    negative.
+
+    The grid is built by broadcasting into `out`, a reusable (n, n)
+    buffer, or into a new array of type `dtype` (float64 by default,
+    float32 halves the memory).
+    """
+    num_states = len(k_grid)
+    if out is None:
+        out = np.empty((num_states, num_states), dtype= dtype or float)
+
+    for _ in _grid_blocks(k_grid, alpha, delta, out):
+        pass
+    return out
+
+
+def capital_grid(dev, num_states, beta, alpha, delta):
+    """
+    Evenly spaced capital grid of `num_states` points within the relative
+    deviation `dev` (0.2 by default) around the steady state
     """
     # Capitals at steady state
     capitals = capital_ss(alpha, beta, delta)
@@ -43,11 +87,110 @@ def get_grid(dev, num_states, beta, alpha, delta, sigma):
         dev = 0.2  
     grid_min, grid_max = (1.0 - dev)*capitals, (1.0 + dev)*capitals
 
+    return np.linspace(grid_min, grid_max, num_states)
+
+def _grid_files(path):
+    """
+    Files of an on-disk grid in the directory `path`
+    """
+    return (os.path.join(path, "c_grid.npy"), os.path.join(path, "u_grid.npy"),
+            os.path.join(path, "grid.json"))
+
+def _open_grid_files(path, spec):
+    """
+    Open the on-disk grids of `path` read-only, or return None when they
+    are missing or were built with another `spec`
+    """
+    c_file, u_file, spec_file = _grid_files(path)
+    try:
+        with open(spec_file) as f:
+            if json.load(f) != spec:
+                return None
+        return np.load(c_file, mmap_mode="r"), np.load(u_file, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+
+def get_grid(dev, num_states, beta, alpha, delta, sigma, dtype=None, out=None, path=None):
+    """
+    Create capital, consumption and utility grid 
+    by moving from some K_state (today) to some K_action (next period)
+
+    `dtype` is the type of the consumption and utility grids, float64 by
+    default or float32. `out` is an optional pair of (n, n) buffers
+    (c_grid, u_grid) that are filled instead of allocating new grids,
+    e.g. when many parameter sets are solved one after the other.
+
+    `path` is a directory for grids too large for the memory: c_grid and
+    u_grid are then written block by block to the memory-mapped files
+    c_grid.npy and u_grid.npy, and returned as read-only `np.memmap`
+    arrays. A later call with the same arguments reuses the files. The
+    solvers of `ddp_algorithms` stream over memory-mapped grids with the
+    "streamed" kernel.
+   
+    """
     # Capital grid
-    k_grid = np.linspace(grid_min, grid_max, num_states)
+    k_grid = capital_grid(dev, num_states, beta, alpha, delta)
+
+    if path is not None:
+        if out is not None:
+            raise ValueError("Pass either out or path")
+        # Python scalars, so that e.g. a np.int64 num_states can be saved in
+        # the spec and the .npy headers
+        spec = {"dev": None if dev is None else float(dev), "num_states": int(num_states),
+                "beta": float(beta), "alpha": float(alpha), "delta": float(delta),
+                "sigma": float(sigma), "dtype": np.dtype(dtype or float).str}
+        grids = _open_grid_files(path, spec)
+        if grids is not None:
+            return (k_grid,) + grids
+
+        # The spec is written last, so an interrupted run is never reused.
+        # The grids are built in temporary files and moved into place, the
+        # memory maps of an earlier call keep the files they opened
+        os.makedirs(path, exist_ok=True)
+        c_file, u_file, spec_file = _grid_files(path)
+        if os.path.exists(spec_file):
+            os.remove(spec_file)
+        tmp_files = [name[:-len(".npy")] + ".tmp.npy" for name in (c_file, u_file)]
+        out = tuple(np.lib.format.open_memmap(name, mode="w+", dtype= dtype or float,
+                                              shape=(spec["num_states"], spec["num_states"]))
+                    for name in tmp_files)
+        get_grid(dev, num_states, beta, alpha, delta, sigma, out=out)
+        for grid in out:
+            grid.flush()
+        del out
+        for tmp_file, name in zip(tmp_files, (c_file, u_file)):
+            os.replace(tmp_file, name)
+        with open(spec_file, "w") as f:
+            json.dump(spec, f)
+        return (k_grid,) + _open_grid_files(path, spec)
     
+    if out is None:
+        out = (np.empty((num_states, num_states), dtype= dtype or float),
+               np.empty((num_states, num_states), dtype= dtype or float))
+    c_grid, u_grid = out
+
+    # Consumption and utility grid, block by block
+    for rows, c_block in _grid_blocks(k_grid, alpha, delta, c_grid):
+        crra(c_block, sigma, out=u_grid[rows])
+
+    return k_grid, c_grid, u_grid
+
+def get_grid_stochastic(dev, num_states, shocks, beta, alpha, delta, sigma):
+    """
+    Create capital, consumption and utility grid of the Ramsey model with
+    the production function z * k^alpha and the productivity levels `shocks`,
+    e.g. `np.exp(z_grid)` of `tauchen` or `rouwenhorst`.
+
+    The capital grid is built around the deterministic steady state as in
+    `get_grid`. The consumption and utility grids have shape (n, n, n_z),
+    c_grid[k_action, k_state, z].
+    """
+    # Capital grid
+    k_grid = capital_grid(dev, num_states, beta, alpha, delta)
+
     # Consumption grid
-    c_grid = consumption_grid_mat(k_grid,alpha,delta)
+    wealth = np.asarray(shocks)[None,:]*np.power(k_grid, alpha)[:,None] + (1 - delta)*k_grid[:,None]
+    c_grid = wealth[None,:,:] - k_grid[:,None,None]
     c_grid[c_grid < 0] = np.nan
 
     # Utility grid
@@ -55,6 +198,64 @@ def get_grid(dev, num_states, beta, alpha, delta, sigma):
 
     return k_grid, c_grid, u_grid
 
+def interpolate_value(k_from, value, k_to):
+    """
+    Linearly interpolate a value function from the capital grid `k_from`
+    onto the capital grid `k_to`, extrapolating linearly outside of `k_from`
+    """
+    v_to = np.interp(k_to, k_from, value)
+
+    slope_low = (value[1] - value[0])/(k_from[1] - k_from[0])
+    slope_high = (value[-1] - value[-2])/(k_from[-1] - k_from[-2])
+    below, above = k_to < k_from[0], k_to > k_from[-1]
+    v_to[below] = value[0] + slope_low*(k_to[below] - k_from[0])
+    v_to[above] = value[-1] + slope_high*(k_to[above] - k_from[-1])
+
+    return v_to
+
+def transfer_solution(k_from, k_to, value=None, policy=None):
+    """
+    Map a solution from the capital grid `k_from` onto the grid `k_to`,
+    e.g. to warm start a solver after a small change of the parameters.
+
+    Parameters
+    ----------
+    value : array_like(float, ndim=1), optional
+            Value function on `k_from`, interpolated with `interpolate_value`.
+
+    policy : array_like(int, ndim=1), optional
+            Policy on `k_from`. The next-period capital k_from[policy] is
+            interpolated onto `k_to` and rounded to the nearest point of `k_to`.
+
+    Returns
+    -------
+    value_to, policy_to : value function and policy on `k_to`, None when
+            not given
+    """
+    value_to, policy_to = None, None
+
+    if value is not None:
+        value_to = interpolate_value(k_from, np.asarray(value), k_to)
+
+    if policy is not None:
+        k_next = np.interp(k_to, k_from, k_from[np.asarray(policy)])
+        upper = np.clip(np.searchsorted(k_to, k_next), 1, len(k_to) - 1)
+        lower = upper - 1
+        policy_to = np.where(k_next - k_to[lower] <= k_to[upper] - k_next, lower, upper)
+
+    return value_to, policy_to
+
+def steady_state_order(k_grid, alpha, beta, delta):
+    """
+    Order of the states by distance to the steady-state capital.
+
+    The optimal policy moves capital toward the steady state, so a
+    Gauss–Seidel sweep in this order updates every state after the
+    states it moves to.
+    """
+    capitals = capital_ss(alpha, beta, delta)
+    return np.argsort(np.absolute(k_grid - capitals), kind="stable")
+
 def consumption_linear_solution(k_grid, alpha, beta, delta, sigma):
     """
     Calculate the solution of linearized system for consumption level
@@ -73,6 +274,12 @@ def linear_solution( k_grid , T, alpha, beta, delta, sigma):
     """
     Solve the linearized system to get the simulated captial and consumption level
 
+    On the stable manifold the consumption deviation is s times the capital
+    deviation, so the capital deviation follows
+        x_{t+1} = (A[1,0]*s + A[1,1]) * x_t = lambda * x_t
+    and every path is the initial deviation times the powers of lambda.
+    All initial capitals are simulated at once as an outer product.
+
     Parameters
     ----------
     T : time vector, of length n
@@ -85,33 +292,104 @@ def linear_solution( k_grid , T, alpha, beta, delta, sigma):
     c_sim:array_like( 2-dimensional ndarray of shape (n, n))
             Simulated consumption levels
     """
-    num_states = len(k_grid)
-
     capitals, consumptions, A = linearized_dynamic_system(alpha, beta, delta, sigma)
 
     # Eigenvalue and eigenvectors
     w, v = np.linalg.eig(A)
     stab_col_ind = np.where(w < 1)
     # Stable choice
-    stab_ind = (v[0,stab_col_ind]/v[1,stab_col_ind])
-
-    # Calculate solution for various beginning k_0 in K-grid
-    k_sim = np.tile(np.nan, [num_states, T])        # capitals simulated
-    c_sim = np.tile(np.nan, [num_states, T])        # consumptions simulated
-    x_t = np.tile(np.nan, [2, T])                   # deviation of capital and consumption
+    stab_ind = (v[0,stab_col_ind]/v[1,stab_col_ind])[0][0]
 
-    for i, k in enumerate(k_grid):
+    # Stable root of the capital deviation
+    root = A[1,0]*stab_ind + A[1,1]
 
-        x_t[1,0] = k - capitals                     #capitals deviation
-        x_t[0,0] = stab_ind[0][0]*x_t[1,0]          #consumptions deviation
+    # Deviations of capital for every beginning k_0 in K-grid
+    k_sim = np.multiply.outer(np.asarray(k_grid) - capitals, np.power(root, np.arange(T)))
+    c_sim = stab_ind*k_sim
 
-        for t in range(T-1):
-            x_t[1,t+1] = np.matmul(A[1,:],x_t[:,t])
-            x_t[0,t+1] = stab_ind[0][0]*x_t[1,t+1]
-        
-        # Computing levels
-        k_sim[i,:] = x_t[1,:] + capitals
-        c_sim[i,:] = x_t[0,:] + consumptions
+    # Computing levels
+    k_sim += capitals
+    c_sim += consumptions
 
     return k_sim, c_sim
 
+
+def cycle_states(policy):
+    """
+    Mask of the states that lie on a cycle of i -> policy[i], e.g. the
+    steady state of a converged policy. Every path of the policy ends on
+    such a state after at most n steps.
+
+    Computed in O(n log n) by squaring the map until it covers n steps.
+    """
+    policy = np.asarray(policy)
+    reach = policy
+    for _ in range(max(1, int(np.ceil(np.log2(len(policy)))))):
+        reach = reach[reach]
+
+    on_cycle = np.zeros(len(policy), dtype= bool)
+    on_cycle[reach] = True
+    return on_cycle
+
+def simulate_policy(k_grid, policy, T, alpha, delta, initial=None):
+    """
+    Simulate the capital and consumption paths of a discrete policy, e.g.
+    `store_policy[num_iter]` of `value_iteration`, from many initial states
+    at once.
+
+    All paths move together with k_{t+1} = k_grid[policy[idx_t]]. Once every
+    path is on a fixed point or cycle (see `cycle_states`), one more period
+    of the cycles is simulated and the rest of the paths repeats it.
+
+    Parameters
+    ----------
+    policy : array_like(int, ndim=1)
+            Policy vector, of length n.
+
+    T : int
+            Number of periods.
+
+    initial : array_like(int, ndim=1), optional
+            Indices of the initial capital stocks, all of `k_grid` by default.
+
+    Returns
+    ----------
+    k_sim: array_like( 2-dimensional ndarray of shape (m, T))
+            Simulated capital stocks, one row per initial state
+
+    c_sim:array_like( 2-dimensional ndarray of shape (m, T))
+            Simulated consumption levels
+    """
+    policy = np.asarray(policy)
+    if initial is None:
+        initial = np.arange(len(k_grid))
+
+    on_cycle = cycle_states(policy)
+
+    idx = np.empty((len(initial), T), dtype= np.intp)
+    idx[:,0] = initial
+    t = 0
+    while t < T - 1 and not on_cycle[idx[:,t]].all():
+        idx[:,t+1] = policy[idx[:,t]]
+        t += 1
+
+    if t < T - 1:
+        # Every path is periodic from t on, with the common period of its cycles
+        period = 1
+        for state in np.unique(idx[:,t]):
+            length, j = 1, policy[state]
+            while j != state:
+                length, j = length + 1, policy[j]
+            period = np.lcm(period, length)
+
+        stop = min(T, t + period)
+        for s in range(t, stop - 1):
+            idx[:,s+1] = policy[idx[:,s]]
+        if stop < T:
+            repeats = -(-(T - t) // period)
+            idx[:,t:] = np.tile(idx[:,t:stop], repeats)[:,:T - t]
+
+    # Consumption of every state under the policy
+    c_policy = np.power(k_grid, alpha) + (1 - delta)*k_grid - k_grid[policy]
+
+    return k_grid[idx], c_policy[idx]
@@ -0,0 +1,168 @@
+"""
+Batched solution of many Ramsey models with different parameters
+
+The utility grids of B models are stacked into a (B, n, n) tensor and the
+Bellman iterations run vectorized over the whole batch. Models leave the
+batch as soon as they converge.
+
+"""
+
+import numpy as np
+
+from codes.ddp_functions import capital_ss
+
+# Working set of a chunk in bytes, see `default_chunk`
+WORKING_SET = 2**23
+
+def _broadcast_parameters(beta, alpha, delta, sigma):
+    """
+    Broadcast the model parameters to 1-dimensional arrays of common length B
+    """
+    beta, alpha, delta, sigma = np.broadcast_arrays(
+        *[np.atleast_1d(np.asarray(x, dtype= float)) for x in (beta, alpha, delta, sigma)])
+
+    assert np.all(sigma != 1), "No provision made for log utility."
+    return beta, alpha, delta, sigma
+
+def get_grid_batch(dev, num_states, beta, alpha, delta, sigma):
+    """
+    Create the capital, consumption and utility grids of a batch of models,
+    as `get_grid` does for a single model.
+
+    Parameters
+    ----------
+    beta, alpha, delta, sigma : float or array_like(float, ndim=1)
+            Model parameters, broadcast to a common length B.
+
+    Returns
+    -------
+    k_grids : array_like( 2-dimensional ndarray of shape (B, n))
+            Capital grids
+
+    c_grids, u_grids : array_like( 3-dimensional ndarray of shape (B, n, n))
+            Consumption and utility grids, c_grids[b, k_action, k_state]
+    """
+    beta, alpha, delta, sigma = _broadcast_parameters(beta, alpha, delta, sigma)
+
+    # Capitals at steady state
+    capitals = capital_ss(alpha, beta, delta)
+    # Setting defaul deviation from steady state
+    if dev is None:
+        dev = 0.2
+    grid_min, grid_max = (1.0 - dev)*capitals, (1.0 + dev)*capitals
+
+    # Capital grids
+    k_grids = np.linspace(grid_min, grid_max, num_states, axis=1)
+
+    # Consumption grids
+    k_state = k_grids[:,None,:]
+    k_action = k_grids[:,:,None]
+    c_grids = (np.power(k_state, alpha[:,None,None])
+               + (1 - delta[:,None,None])*k_state - k_action)
+    c_grids[c_grids < 0] = np.nan
+
+    # Utility grids
+    exponent = 1.0 - sigma[:,None,None]
+    u_grids = (np.power(c_grids, exponent) - 1)/exponent
+
+    return k_grids, c_grids, u_grids
+
+def default_chunk(num_actions, num_states):
+    """
+    Number of models iterated together by default: as many as fit in
+    WORKING_SET (8 MB) with the three float64 (n, n) arrays a model needs
+    in `_iterate_chunk`, its grid, the -inf encoded copy and the work
+    buffer, but at least two
+    """
+    return max(2, WORKING_SET // (3*8*num_actions*num_states))
+
+def batch_value_iteration(crit, max_iter, u_grids, beta, chunk=None):
+    """
+    Solve a batch of models by value iteration.
+
+    Models are processed in chunks of a bounded working set; within a
+    chunk the Bellman iterations are vectorized over the models and the
+    converged models are dropped from the stack.
+
+    Parameters
+    ----------
+    u_grids : array_like( 3-dimensional ndarray of shape (B, n, n))
+            Stacked utility grids, e.g. from `get_grid_batch`
+
+    beta : float or array_like(float, ndim=1)
+            Discount factor of every model
+
+    chunk : int, optional
+            Number of models iterated together, `default_chunk` by default.
+
+    Returns
+    -------
+    values : array_like( 2-dimensional ndarray of shape (B, n))
+            Value functions
+
+    policies : ndarray(int, ndim=2)
+            Policy vectors, of shape (B, n)
+
+    num_iters : ndarray(int, ndim=1)
+            Iterations per model, counted as in `value_iteration`
+    """
+    if crit is None:
+        crit = 1e-06
+
+    num_models, num_actions, num_states = u_grids.shape
+    beta = np.broadcast_to(np.asarray(beta, dtype= float), (num_models,))
+
+    if chunk is None:
+        chunk = default_chunk(num_actions, num_states)
+
+    # set up
+    values = np.zeros((num_models, num_states))
+    policies = np.zeros((num_models, num_states), dtype= int)
+    num_iters = np.full(num_models, max_iter - 1)
+
+    for start in range(0, num_models, chunk):
+        models = np.arange(start, min(start + chunk, num_models))
+        values[models], policies[models], num_iters[models] = _iterate_chunk(
+            crit, max_iter, u_grids[models], beta[models])
+
+    return values, policies, num_iters
+
+def _iterate_chunk(crit, max_iter, u_grids, beta):
+    """
+    Value iteration for a stack of models, vectorized over the stack
+    """
+    num_models, num_actions, num_states = u_grids.shape
+
+    values = np.zeros((num_models, num_states))
+    policies = np.zeros((num_models, num_states), dtype= int)
+    num_iters = np.full(num_models, max_iter - 1)
+
+    # Stack of the models still iterating, as [model, k_state, k_action]
+    # so that the maximization runs over the contiguous last axis
+    active = np.arange(num_models)
+    u_active = np.where(np.isnan(u_grids), -np.inf, u_grids).transpose(0, 2, 1).copy()
+    work = np.empty_like(u_active)
+    val_old = np.zeros((num_models, num_states))
+
+    for i in range(max_iter):
+        np.add(u_active, (beta[active,None]*val_old)[:,None,:], out=work)
+        policy = np.argmax(work, axis=2)
+        val_new = np.take_along_axis(work, policy[:,:,None], axis=2)[:,:,0]
+
+        values[active], policies[active] = val_new, policy
+
+        max_diff = np.max(np.absolute(val_new - val_old), axis=1)
+        # drop models from the stack, when convergence is achieved
+        converged = max_diff < crit
+        if np.any(converged):
+            num_iters[active[converged]] = i
+            active = active[~converged]
+            if len(active) == 0:
+                break
+            u_active = u_active[~converged]
+            work = work[:len(active)]
+            val_new = val_new[~converged]
+
+        val_old = val_new
+
+    return values, policies, num_iters
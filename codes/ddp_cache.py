@@ -0,0 +1,244 @@
+"""
+Persistent content-addressed cache of grids and solutions
+
+Every entry is named after the SHA-256 hash of what it depends on: the
+model parameters and the grid spec, plus the solver, `crit` and the solver
+options for a solution. A repeated `get_grid` or solve is then a file load.
+Solutions are stored as compressed .npz files. Grids are stored as the
+uncompressed .npy files of `get_grid` with `path`, which load as memory
+maps: decompressing a grid takes longer than building it.
+
+The least recently used entries are evicted once the cache exceeds its
+disk budget. The directory is taken from the environment variable
+DDP_CACHE_DIR, ~/.cache/ddp by default.
+
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+
+from codes.ddp_auxiliary import get_grid
+from codes.ddp_algorithms import DPResult
+from codes.ddp_algorithms import IterationHistory
+from codes.ddp_algorithms import value_iteration
+from codes.ddp_algorithms import policy_iteration
+from codes.ddp_algorithms import modified_policy_iteration
+
+# Part of every key, bump it when the stored format changes
+CACHE_VERSION = 1
+
+SOLVERS = ("value_iteration", "policy_iteration", "modified_policy_iteration")
+
+# Names of the entries: a key followed by the suffix of a solution or a grid
+ENTRY_NAME = re.compile(r"[0-9a-f]{64}(\.npz|\.grid)")
+
+def _canonical(obj):
+    """
+    JSON-serializable form of a key part, arrays are replaced by the
+    hash of their content
+    """
+    if isinstance(obj, np.ndarray):
+        content = hashlib.sha256(np.ascontiguousarray(obj).tobytes()).hexdigest()
+        return {"array": content, "shape": list(obj.shape), "dtype": obj.dtype.str}
+    if isinstance(obj, dict):
+        return {str(name): _canonical(value) for name, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_canonical(value) for value in obj]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, type):
+        return np.dtype(obj).str
+    return obj
+
+def cache_key(**parts):
+    """
+    Hex digest of the SHA-256 hash of the key parts, e.g.
+    cache_key(kind="grid", dev=None, num_states=100, beta=0.95, ...)
+    """
+    parts = _canonical(dict(parts, version=CACHE_VERSION))
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+def _json_default(obj):
+    if isinstance(obj, (np.generic, np.ndarray)):
+        return obj.tolist()
+    raise TypeError("{} is not JSON serializable".format(type(obj).__name__))
+
+class SolutionCache:
+    """
+    Disk cache of the grids of `get_grid` and of converged solutions.
+
+    Parameters
+    ----------
+    directory : str, optional
+            Cache directory, DDP_CACHE_DIR or ~/.cache/ddp by default.
+
+    budget : int, optional
+            Disk budget in bytes, 1 GB by default. Least recently used
+            entries are evicted after every store beyond the budget.
+
+    Attributes
+    ----------
+    stats : dict
+            Number of grid hits and misses, solution hits and misses and
+            evictions of this instance. The grid lookup of a solved
+            model counts as a grid lookup.
+    """
+
+    def __init__(self, directory=None, budget=None):
+        if directory is None:
+            directory = os.environ.get("DDP_CACHE_DIR",
+                                       os.path.join(os.path.expanduser("~"), ".cache", "ddp"))
+        if budget is None:
+            budget = 2**30
+        self.directory = directory
+        self.budget = budget
+        self.stats = {"grid_hits": 0, "grid_misses": 0, "solution_hits": 0,
+                      "solution_misses": 0, "evictions": 0}
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry(self, key, suffix):
+        return os.path.join(self.directory, key + suffix)
+
+    def _touch(self, entry):
+        """
+        Mark an entry as used now, the LRU order is the order of the
+        modification times
+        """
+        os.utime(entry)
+
+    def entries(self):
+        """
+        (path, size in bytes, last use) of every entry, least recently used first.
+        Other files of the directory are not entries, they are never evicted.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            entry = os.path.join(self.directory, name)
+            if not ENTRY_NAME.fullmatch(name):
+                continue
+            if os.path.isdir(entry):
+                size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+            else:
+                size = os.path.getsize(entry)
+            entries.append((entry, size, os.path.getmtime(entry)))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def size(self):
+        """Disk usage of the cache in bytes"""
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        """
+        Remove least recently used entries until the cache fits its budget,
+        never the entry `keep`
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for entry, size, _ in entries:
+            if total <= self.budget:
+                break
+            if entry == keep:
+                continue
+            if os.path.isdir(entry):
+                shutil.rmtree(entry)
+            else:
+                os.remove(entry)
+            total -= size
+            self.stats["evictions"] += 1
+
+    def clear(self):
+        """Remove every entry"""
+        for entry, _, _ in self.entries():
+            if os.path.isdir(entry):
+                shutil.rmtree(entry)
+            else:
+                os.remove(entry)
+
+    def _load(self, key):
+        """
+        Arrays of the solution entry `key`, or None on a miss
+        """
+        entry = self._entry(key, ".npz")
+        try:
+            with np.load(entry) as stored:
+                arrays = {name: stored[name] for name in stored.files}
+        except (OSError, ValueError):
+            self.stats["solution_misses"] += 1
+            return None
+        self._touch(entry)
+        self.stats["solution_hits"] += 1
+        return arrays
+
+    def _store(self, key, **arrays):
+        """
+        Write the .npz entry `key` atomically and evict beyond the budget
+        """
+        entry = self._entry(key, ".npz")
+        tmp = self._entry(key, ".tmp.npz")
+        np.savez_compressed(tmp, **arrays)
+        os.replace(tmp, entry)
+        self.evict(keep=entry)
+
+    def grid(self, dev, num_states, beta, alpha, delta, sigma, dtype=None, mmap=False):
+        """
+        `get_grid` through the cache, returns (k_grid, c_grid, u_grid).
+
+        With `mmap` the grids are returned as the read-only `np.memmap`
+        arrays of the cache files, for grids too large to load, else as
+        arrays in memory.
+        """
+        key = cache_key(kind="grid", dev=dev, num_states=num_states, beta=beta, alpha=alpha,
+                        delta=delta, sigma=sigma, dtype=np.dtype(dtype or float).str)
+
+        entry = self._entry(key, ".grid")
+        hit = os.path.exists(os.path.join(entry, "grid.json"))
+        self.stats["grid_hits" if hit else "grid_misses"] += 1
+        k_grid, c_grid, u_grid = get_grid(dev, num_states, beta, alpha, delta, sigma, dtype=dtype, path=entry)
+        self._touch(entry)
+        if not hit:
+            self.evict(keep=entry)
+
+        if mmap:
+            return k_grid, c_grid, u_grid
+        return k_grid, np.array(c_grid), np.array(u_grid)
+
+    def solve(self, solver, dev, num_states, beta, alpha, delta, sigma, crit=None, max_iter=500,
+              k=None, **solver_kwargs):
+        """
+        Solve the model with one of SOLVERS through the cache.
+
+        The key holds the parameters, the grid spec, the solver, `crit`,
+        `max_iter`, `k` and `solver_kwargs`, e.g. backend="numba" or
+        seed=0. Returns the `DPResult` of the solver with history "none";
+        on a hit it is loaded from disk, with `info` as stored.
+        """
+        if solver not in SOLVERS:
+            raise ValueError("Unknown solver: {}".format(solver))
+
+        key = cache_key(kind="solution", dev=dev, num_states=num_states, beta=beta, alpha=alpha,
+                        delta=delta, sigma=sigma, solver=solver, crit=crit, max_iter=max_iter,
+                        k=k, kwargs=solver_kwargs)
+        arrays = self._load(key)
+        if arrays is not None:
+            history = IterationHistory("none", max_iter, arrays["value"].shape)
+            return DPResult(arrays["value"], arrays["policy"], int(arrays["num_iter"]), history,
+                            json.loads(str(arrays["info"])))
+
+        _, _, u_grid = self.grid(dev, num_states, beta, alpha, delta, sigma)
+        if solver == "value_iteration":
+            result = value_iteration(crit, max_iter, u_grid, beta, history="none", **solver_kwargs)
+        elif solver == "policy_iteration":
+            result = policy_iteration(max_iter, u_grid, beta, history="none", **solver_kwargs)
+        else:
+            result = modified_policy_iteration(crit, k, max_iter, u_grid, beta, history="none",
+                                               **solver_kwargs)
+
+        info = json.dumps(result.info, default=_json_default)
+        self._store(key, value=result.value, policy=result.policy, num_iter=result.num_iter,
+                    info=np.array(info))
+        return result
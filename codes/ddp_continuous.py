@@ -0,0 +1,414 @@
+"""
+Solvers with a continuous choice of next-period capital
+
+The value function is known on the capital grid only, but k' may take any
+value between the grid bounds: V is interpolated between the grid points
+and the Bellman maximization runs for all states at once. A coarse grid
+then gives the accuracy of a much finer discrete grid.
+
+The endogenous grid method and time iteration solve the Euler equation
+instead and need no maximization at all.
+
+"""
+
+import numpy as np
+from scipy.interpolate import CubicSpline
+
+from codes.ddp_functions import f
+from codes.ddp_functions import f_prime
+from codes.ddp_functions import f_dprime
+from codes.ddp_functions import crra
+from codes.ddp_functions import crra_prime
+from codes.ddp_functions import crra_dprime
+from codes.ddp_functions import crra_prime_inverse
+from codes.ddp_auxiliary import interpolate_value
+from codes.ddp_algorithms import IterationHistory
+from codes.ddp_algorithms import _solver_output
+
+# Inverse golden ratio
+GOLDEN = (np.sqrt(5) - 1)/2
+
+def wealth(k_grid, alpha, delta):
+    """
+    Resources f(k) + (1 - delta) * k available at every capital stock
+    """
+    return f(k_grid, alpha) + (1 - delta)*k_grid
+
+def interpolate(k_grid, value, kind=None):
+    """
+    Interpolant of a value function known on `k_grid`.
+
+    Parameters
+    ----------
+    kind : str, optional
+            "cubic" (default) uses a not-a-knot cubic spline, "linear"
+            is less accurate but keeps V concave between the grid points.
+
+    Returns
+    -------
+    Callable evaluating the interpolant at an array of capital stocks.
+    """
+    if kind is None or kind == "cubic":
+        return CubicSpline(k_grid, value)
+    if kind == "linear":
+        return lambda k: np.interp(k, k_grid, value)
+    raise ValueError("Unknown interpolation: {}".format(kind))
+
+def golden_section_max(objective, lower, upper, tol=None):
+    """
+    Maximize a unimodal `objective` on [lower, upper] for many problems at
+    once. Every step evaluates the objective once, for all problems.
+
+    Parameters
+    ----------
+    objective : callable
+            Maps an array x of the shape of `lower` to the objective values,
+            element by element.
+
+    lower, upper : array_like(float, ndim=1)
+            Bounds of every problem.
+
+    tol : float, optional
+            Width of the final brackets, 1e-10 by default.
+
+    Returns
+    -------
+    x_max, f_max : array_like(float, ndim=1)
+            Maximizers and maximum values.
+    """
+    if tol is None:
+        tol = 1e-10
+
+    a, b = np.array(lower, dtype= float), np.array(upper, dtype= float)
+    c, d = b - GOLDEN*(b - a), a + GOLDEN*(b - a)
+    f_c, f_d = objective(c), objective(d)
+
+    num_steps = int(np.ceil(np.log(tol/max(np.max(b - a), tol))/np.log(GOLDEN)))
+    for _ in range(num_steps):
+        # Keep [a, d] where f(c) > f(d), else [c, b]; one inner point carries over
+        left = f_c > f_d
+        a, b = np.where(left, a, c), np.where(left, d, b)
+        c, d = np.where(left, b - GOLDEN*(b - a), d), np.where(left, c, a + GOLDEN*(b - a))
+
+        f_x = objective(np.where(left, c, d))
+        f_c, f_d = np.where(left, f_x, f_d), np.where(left, f_c, f_x)
+
+    x_max = np.where(f_c > f_d, c, d)
+    return x_max, np.maximum(f_c, f_d)
+
+def continuous_bellman_max(k_grid, val_old, beta, alpha, delta, sigma, kind=None, tol=None):
+    """
+    Bellman operator with k' anywhere in [k_grid[0], k_grid[-1]]
+
+    Parameters
+    ----------
+    val_old : array_like(float, ndim=1)
+            Old value function on `k_grid`, of length n.
+
+    kind, tol :
+            Interpolation of `interpolate` and tolerance of `golden_section_max`.
+
+    Returns
+    -------
+    value_fn : array_like(float, ndim=1)
+            Value function vector, of length n.
+
+    k_policy : array_like(float, ndim=1)
+            Next-period capital of every state, of length n.
+    """
+    resources = wealth(k_grid, alpha, delta)
+    v_next = interpolate(k_grid, val_old, kind)
+
+    def objective(k_next):
+        return crra(resources - k_next, sigma) + beta*v_next(k_next)
+
+    # Keep consumption positive
+    upper = np.minimum(k_grid[-1], resources - 1e-10)
+    lower = np.minimum(k_grid[0], upper)
+    k_policy, value_fn = golden_section_max(objective, lower, upper, tol)
+
+    return value_fn, k_policy
+
+def continuous_value_iteration(crit, max_iter, k_grid, beta, alpha, delta, sigma, kind=None, tol=None,
+                               history=None, v0=None):
+    """
+    Solve the optimization problem by value iteration with a continuous
+    choice of k', see `continuous_bellman_max`.
+
+    `history` works as in `value_iteration` but defaults to "none"; the
+    policies are next-period capital stocks rather than grid indices. The
+    consumption policy is reported as `info["consumption"]` of the
+    returned `DPResult`.
+
+    """
+    if crit is None:
+        crit = 1e-06
+
+    if history is None:
+        history = "none"
+
+    num_states = len(k_grid)
+
+    # set up
+    store = IterationHistory(history, max_iter, num_states, policy_dtype= float)
+    val_old = np.zeros(num_states) if v0 is None else np.array(v0, dtype= float)
+
+    for i in range(max_iter):
+        val_new, k_policy = continuous_bellman_max(k_grid, val_old, beta, alpha, delta, sigma, kind, tol)
+        store.record(i, val_new, k_policy)
+
+        max_diff = np.max(np.absolute(val_new - val_old))
+        # quit iterations, when convergence is achieved
+        if max_diff < crit:
+            break
+
+        val_old = val_new
+
+    num_iter = i
+
+    info = {"consumption": wealth(k_grid, alpha, delta) - k_policy}
+    return _solver_output(store, val_new, k_policy, num_iter, info)
+
+def policy_value(k_grid, c_policy, beta, alpha, delta, sigma, tol=None):
+    """
+    Value of following the consumption policy `c_policy` forever, from
+    every point of `k_grid` at once.
+
+    The paths are simulated with the policy linearly interpolated between
+    the grid points until beta^t falls below `tol` (1e-10 by default); the
+    remaining tail is valued at the last consumption level.
+    """
+    if tol is None:
+        tol = 1e-10
+
+    capital = np.array(k_grid, dtype= float)
+    value, discount = np.zeros(len(k_grid)), 1.0
+    while True:
+        consumption = np.interp(capital, k_grid, c_policy)
+        if discount < tol:
+            return value + discount*crra(consumption, sigma)/(1 - beta)
+        value += discount*crra(consumption, sigma)
+        capital = wealth(capital, alpha, delta) - consumption
+        discount *= beta
+
+def endogenous_grid_method(crit, max_iter, k_grid, beta, alpha, delta, sigma, c0=None):
+    """
+    Solve the optimization problem by the endogenous grid method.
+
+    The grid is taken as next-period capital k'. The Euler equation
+        u'(c) = beta * u'(c(k')) * (f'(k') + 1 - delta)
+    gives today's consumption in closed form, and the wealth c + k' it
+    needs is today's endogenous grid point. Interpolating c over that
+    wealth back onto `k_grid` updates the consumption policy without any
+    maximization, in O(n) per iteration.
+
+    Parameters
+    ----------
+    c0 : array_like(float, ndim=1), optional
+            Initial consumption policy on `k_grid`, by default the
+            consumption that keeps the capital stock constant.
+
+    Returns
+    -------
+    result : DPResult
+            Value function and next-period capital on `k_grid`, see
+            `policy_value`, with the consumption policy as
+            `info["consumption"]` and `num_iter` counted as in
+            `value_iteration`.
+    """
+    if crit is None:
+        crit = 1e-06
+
+    num_states = len(k_grid)
+    resources = wealth(k_grid, alpha, delta)
+    gross_return = f_prime(k_grid, alpha) + 1 - delta
+
+    c_old = resources - k_grid if c0 is None else np.array(c0, dtype= float)
+
+    for i in range(max_iter):
+        # Consumption today and the wealth it needs, for every k' of the grid
+        c_endogenous = crra_prime_inverse(beta*crra_prime(c_old, sigma)*gross_return, sigma)
+        wealth_endogenous = c_endogenous + k_grid
+
+        c_new = interpolate_value(wealth_endogenous, c_endogenous, resources)
+
+        max_diff = np.max(np.absolute(c_new - c_old))
+        # quit iterations, when convergence is achieved
+        if max_diff < crit:
+            break
+
+        c_old = c_new
+
+    num_iter = i
+
+    k_policy = resources - c_new
+    value = policy_value(k_grid, c_new, beta, alpha, delta, sigma)
+
+    store = IterationHistory("none", max_iter, num_states, policy_dtype= float)
+    return _solver_output(store, value, k_policy, num_iter, {"consumption": c_new})
+
+def newton_bisection(fun, lower, upper, tol=None, max_iter=None):
+    """
+    Find the roots of decreasing functions on [lower, upper] for many
+    problems at once.
+
+    Every step takes the Newton step where it stays inside the bracket of
+    the problem and bisects elsewhere, so it converges like Newton's method
+    near the root and never fails. Problems without a sign change end at the
+    bound closest to the root.
+
+    Parameters
+    ----------
+    fun : callable
+            Maps an array x of the shape of `lower` to the values and the
+            derivatives of the functions, element by element.
+
+    tol : float, optional
+            Tolerance on the step, 1e-12 by default.
+
+    max_iter : int, optional
+            Maximum number of steps, 100 by default.
+
+    Returns
+    -------
+    x : array_like(float, ndim=1)
+            Roots.
+    """
+    if tol is None:
+        tol = 1e-12
+    if max_iter is None:
+        max_iter = 100
+
+    lower, upper = np.array(lower, dtype= float), np.array(upper, dtype= float)
+    x = (lower + upper)/2
+
+    for _ in range(max_iter):
+        value, slope = fun(x)
+        # The root is right of x where the decreasing function is positive
+        lower = np.where(value > 0, x, lower)
+        upper = np.where(value > 0, upper, x)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_newton = x - value/slope
+        inside = (x_newton > lower) & (x_newton < upper)
+        x_new = np.where(inside, x_newton, (lower + upper)/2)
+
+        step = np.max(np.absolute(x_new - x))
+        x = x_new
+        if step < tol:
+            break
+
+    return x
+
+def euler_residual(k, consumption, k_grid, c_policy, beta, alpha, delta, sigma):
+    """
+    Residual u'(c) - beta * u'(c(k')) * (f'(k') + 1 - delta) of the Euler
+    equation at capital `k` and consumption `consumption`, with c(k') the
+    consumption policy `c_policy` linearly interpolated over `k_grid`.
+
+    Returns
+    -------
+    residual, slope : array_like(float, ndim=1)
+            Residual and its derivative with respect to consumption.
+    """
+    k_next = wealth(k, alpha, delta) - consumption
+
+    # Linear interpolation of c(k') and its slope on the grid interval
+    upper = np.clip(np.searchsorted(k_grid, k_next), 1, len(k_grid) - 1)
+    lower = upper - 1
+    c_slope = (c_policy[upper] - c_policy[lower])/(k_grid[upper] - k_grid[lower])
+    c_next = c_policy[lower] + c_slope*(k_next - k_grid[lower])
+
+    gross_return = f_prime(k_next, alpha) + 1 - delta
+    residual = crra_prime(consumption, sigma) - beta*crra_prime(c_next, sigma)*gross_return
+    # k' falls one for one with consumption
+    slope = crra_dprime(consumption, sigma) + beta*(
+        crra_dprime(c_next, sigma)*c_slope*gross_return + crra_prime(c_next, sigma)*f_dprime(k_next, alpha))
+
+    return residual, slope
+
+def euler_errors(k_grid, c_policy, beta, alpha, delta, sigma, k_test=None):
+    """
+    Euler-equation errors log10|1 - u'^-1(beta * u'(c(k')) * R(k')) / c(k)|
+    of a consumption policy, in units of consumption.
+
+    Parameters
+    ----------
+    k_test : array_like(float, ndim=1), optional
+            Capital stocks where the errors are evaluated, by default the
+            midpoints of `k_grid`, where the interpolation error is largest.
+
+    Returns
+    -------
+    errors : array_like(float, ndim=1)
+            Decimal log of the relative errors, -3 means $1 per $1000
+            consumed.
+    """
+    if k_test is None:
+        k_test = (k_grid[1:] + k_grid[:-1])/2
+
+    consumption = np.interp(k_test, k_grid, c_policy)
+    k_next = wealth(k_test, alpha, delta) - consumption
+    gross_return = f_prime(k_next, alpha) + 1 - delta
+    c_euler = crra_prime_inverse(beta*crra_prime(np.interp(k_next, k_grid, c_policy), sigma)*gross_return, sigma)
+
+    with np.errstate(divide="ignore"):
+        return np.log10(np.absolute(1 - c_euler/consumption))
+
+def time_iteration(crit, max_iter, k_grid, beta, alpha, delta, sigma, c0=None, tol=None):
+    """
+    Solve the optimization problem by time iteration on the Euler equation.
+
+    Every iteration solves the Euler equation of `euler_residual` for the
+    consumption of all grid points at once with `newton_bisection`, given
+    the consumption policy of the previous iteration for tomorrow. k' is
+    kept inside the grid.
+
+    Parameters
+    ----------
+    c0 : array_like(float, ndim=1), optional
+            Initial consumption policy, as in `endogenous_grid_method`.
+
+    tol : float, optional
+            Tolerance of `newton_bisection`.
+
+    Returns
+    -------
+    result : DPResult
+            As from `endogenous_grid_method`. `info` also holds the
+            `euler_errors` at the midpoints of `k_grid` and their maximum
+            and mean as "max_euler_error" and "mean_euler_error".
+    """
+    if crit is None:
+        crit = 1e-06
+
+    num_states = len(k_grid)
+    resources = wealth(k_grid, alpha, delta)
+    c_old = resources - k_grid if c0 is None else np.array(c0, dtype= float)
+
+    # Consumption keeping k' within the grid
+    c_lower = np.maximum(resources - k_grid[-1], 1e-10)
+    c_upper = resources - k_grid[0]
+
+    for i in range(max_iter):
+        c_new = newton_bisection(
+            lambda c: euler_residual(k_grid, c, k_grid, c_old, beta, alpha, delta, sigma),
+            c_lower, c_upper, tol)
+
+        max_diff = np.max(np.absolute(c_new - c_old))
+        # quit iterations, when convergence is achieved
+        if max_diff < crit:
+            break
+
+        c_old = c_new
+
+    num_iter = i
+
+    k_policy = resources - c_new
+    value = policy_value(k_grid, c_new, beta, alpha, delta, sigma)
+    errors = euler_errors(k_grid, c_new, beta, alpha, delta, sigma)
+
+    info = {"consumption": c_new, "euler_errors": errors,
+            "max_euler_error": np.max(errors), "mean_euler_error": np.mean(errors)}
+    store = IterationHistory("none", max_iter, num_states, policy_dtype= float)
+    return _solver_output(store, value, k_policy, num_iter, info)
@@ -1,4 +1,5 @@
 import numpy as np
+from scipy.special import ndtr
 
 def f(k, alpha):
     """
@@ -6,6 +7,12 @@ def f(k, alpha):
     """
     return k**alpha
 
+def f_prime(k, alpha):
+    """
+    First derivative of the production function
+    """
+    return alpha * k**(alpha - 1)
+
 def f_dprime(k, alpha):
     """
     Second derivative of the production function
@@ -18,24 +25,39 @@ def crra_prime(c,sigma):
     """
     return 1/(c**(sigma))
 
+def crra_prime_inverse(mu, sigma):
+    """
+    Consumption with the marginal utility `mu`, inverse of `crra_prime`
+    """
+    return mu**(-1/sigma)
+
 def crra_dprime(c,sigma):
     """
     First derivative of the utility function
     """
     return -sigma/(c**(1+sigma))
 
-def crra(c, sigma):
+def crra(c, sigma, out=None):
     """
     Return the CRRA utility evaluation 
 
     Utility = (C^(1 - sigma) - 1)/(1 - sigma)
 
+    With `out`, the utility is computed in place in that array (which may
+    be `c` itself) without temporary arrays.
+
     """
 
     assert sigma != 1, "No provision made for log utility."
 
-    numerator = c ** (1.0 - sigma)
     denominator = 1.0 - sigma
+    if out is not None:
+        np.power(c, denominator, out=out)
+        np.subtract(out, 1, out=out)
+        np.divide(out, denominator, out=out)
+        return out
+
+    numerator = c ** (1.0 - sigma)
     utility = np.divide(numerator - 1, denominator)
 
     return utility
@@ -76,4 +98,58 @@ def linearized_dynamic_system(alpha, beta, delta, sigma):
 
     return capitals, consumptions, A
 
+def tauchen(num_shocks, rho, sigma_e, m=None):
+    """
+    Tauchen discretization of the AR(1) log productivity
+        log z' = rho * log z + e,   e ~ N(0, sigma_e^2)
+
+    The grid spans `m` (3 by default) unconditional standard deviations.
+
+    Returns
+    -------
+    z_grid : array_like(float, ndim=1)
+            Grid of log z, of length num_shocks
+
+    transition : array_like( 2-dimensional ndarray of shape (num_shocks, num_shocks))
+            Markov matrix, transition[z, z'] = P(z' | z)
+    """
+    if m is None:
+        m = 3
+
+    std_z = sigma_e/np.sqrt(1 - rho**2)
+    z_grid = np.linspace(-m*std_z, m*std_z, num_shocks)
+    step = z_grid[1] - z_grid[0]
+
+    # Probability mass of the interval around every grid point
+    mean = rho*z_grid[:,None]
+    upper = ndtr((z_grid[None,:] + step/2 - mean)/sigma_e)
+    lower = ndtr((z_grid[None,:] - step/2 - mean)/sigma_e)
+    upper[:,-1], lower[:,0] = 1.0, 0.0
+    transition = upper - lower
+
+    return z_grid, transition
+
+def rouwenhorst(num_shocks, rho, sigma_e):
+    """
+    Rouwenhorst discretization of the AR(1) log productivity of `tauchen`.
+
+    Matches the conditional mean and variance exactly, which makes it the
+    better choice for persistent shocks (rho close to 1).
+    """
+    std_z = sigma_e/np.sqrt(1 - rho**2)
+    z_max = np.sqrt(num_shocks - 1)*std_z
+    z_grid = np.linspace(-z_max, z_max, num_shocks)
+
+    p = (1 + rho)/2
+    transition = np.array([[p, 1 - p], [1 - p, p]])
+    for n in range(3, num_shocks + 1):
+        padded = np.zeros((n, n))
+        padded[:-1,:-1] += p*transition
+        padded[:-1,1:] += (1 - p)*transition
+        padded[1:,:-1] += (1 - p)*transition
+        padded[1:,1:] += p*transition
+        # Inner rows are counted twice
+        padded[1:-1] /= 2
+        transition = padded
 
+    return z_grid, transition
@@ -0,0 +1,111 @@
+"""
+Matrix-free Bellman operator for the deterministic Ramsey model
+
+The utility of moving from k (today) to k' (next period) is computed on the
+fly for tiles of states, so the n×n consumption and utility grids of
+`get_grid` are never materialized. Peak memory is O(n·tile) instead of O(n²).
+
+"""
+
+import numpy as np
+
+from codes.ddp_functions import crra
+from codes.ddp_algorithms import fused_bellman_max
+from codes.ddp_algorithms import IterationHistory
+from codes.ddp_algorithms import _solver_output
+
+def utility_tile(k_grid, start, stop, alpha, delta, sigma):
+    """
+    Utility grid restricted to the states `k_grid[start:stop]`
+
+    Returns
+    -------
+    u_tile : array_like( 2-dimensional ndarray of shape (n, stop - start))
+            Utility of every action for the selected states, -inf if
+            infeasible as in `feasible_grid`
+    """
+    k_state = k_grid[start:stop]
+    k_action = k_grid[:,None]
+    c_tile = np.power(k_state, alpha) + (1 - delta)*k_state - k_action
+    infeasible = c_tile < 0
+    c_tile[infeasible] = np.nan
+    u_tile = crra(c_tile, sigma, out=c_tile)
+    u_tile[infeasible] = -np.inf
+
+    return u_tile
+
+def blocked_bellman_max(k_grid, val_old, beta, alpha, delta, sigma, tile=None):
+    """
+    Apply the Bellman operator and the state-wise maximum tile by tile.
+
+    Gives the same result as `fused_bellman_max(feasible_grid(u_grid), val_old, beta)`
+    for the `u_grid` of `get_grid`: infeasible actions are never picked.
+
+    Parameters
+    ----------
+    k_grid : array_like(float, ndim=1)
+            Capital grid, of length n.
+
+    val_old : array_like(float, ndim=1)
+            Old value function vector, of length n.
+
+    tile : int, optional
+            Number of states processed at once, 512 by default.
+
+    Returns
+    -------
+    value_fn : array_like(float, ndim=1)
+            Value function vector, of length n.
+
+    policy : ndarray(int, ndim=1)
+        Policy vector, of length n.
+    """
+    if tile is None:
+        tile = 512
+
+    num_states = len(k_grid)
+    value_fn = np.empty(num_states)
+    policy = np.empty(num_states, dtype= np.intp)
+
+    for start in range(0, num_states, tile):
+        stop = min(start + tile, num_states)
+        u_tile = utility_tile(k_grid, start, stop, alpha, delta, sigma)
+        fused_bellman_max(u_tile, val_old, beta, value_fn=value_fn[start:stop],
+                          policy=policy[start:stop])
+
+    return value_fn, policy
+
+def matrix_free_value_iteration(crit, max_iter, k_grid, beta, alpha, delta, sigma, tile=None, history=None):
+    """
+    Solve the optimization problem by value iteration without building `u_grid`.
+
+    `history` works as in `value_iteration` but defaults to "none", so a
+    `DPResult` is returned and no max_iter×n store is allocated.
+
+    """
+    if crit is None:
+        crit = 1e-06
+
+    if history is None:
+        history = "none"
+
+    num_states = len(k_grid)
+
+    # set up
+    store = IterationHistory(history, max_iter, num_states)
+    val_old = np.zeros(num_states)
+
+    for i in range(max_iter):
+        val_new, policy = blocked_bellman_max(k_grid, val_old, beta, alpha, delta, sigma, tile)
+        store.record(i, val_new, policy)
+
+        max_diff = np.max(np.absolute(val_new - val_old))
+        # quit iterations, when convergence is achieved
+        if max_diff < crit:
+            break
+
+        val_old = val_new
+
+    num_iter = i
+
+    return _solver_output(store, val_new, policy, num_iter)
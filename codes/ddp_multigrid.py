@@ -0,0 +1,71 @@
+"""
+Multigrid warm start for value iteration
+
+The problem is solved on a sequence of increasingly fine capital grids. The
+value function or the policy of each level, interpolated onto the next grid,
+is the initial guess of the next level, so only a few iterations are left on
+the fine grid.
+
+"""
+
+from time import time
+
+from codes.ddp_auxiliary import get_grid
+from codes.ddp_auxiliary import transfer_solution
+from codes.ddp_algorithms import value_iteration
+
+def multigrid_value_iteration(crit, max_iter, dev, levels, beta, alpha, delta, sigma, warm_start=None,
+                              **kwargs):
+    """
+    Solve the optimization problem by value iteration on the grids of `levels`.
+
+    Parameters
+    ----------
+    levels : list of int
+            Number of states of every grid, from coarse to fine, e.g. [50, 200, 800].
+
+    warm_start : str, optional
+            "value" (default) starts every level from the value function of
+            the previous level, interpolated with `interpolate_value`;
+            "policy" from the previous policy mapped by `transfer_solution`
+            and valued exactly, see `policy0` of `value_iteration`, which
+            only uses one of the two.
+
+    kwargs
+            Passed on to `value_iteration` at every level, e.g. kernel or backend.
+
+    Returns
+    -------
+    k_grid, c_grid, u_grid : grids of the finest level, as from `get_grid`
+
+    result : DPResult
+            Solution on the finest level. `result.info["levels"]` lists
+            num_states, num_iter and time (seconds) of every level.
+    """
+    if warm_start is None:
+        warm_start = "value"
+    if warm_start not in ("value", "policy"):
+        raise ValueError("Unknown warm start: {}".format(warm_start))
+    if kwargs.get("history") is None:
+        kwargs["history"] = "none"
+
+    stats = []
+    k_prev, result = None, None
+
+    for num_states in levels:
+        start = time()
+        k_grid, c_grid, u_grid = get_grid(dev, num_states, beta, alpha, delta, sigma)
+
+        v0, policy0 = None, None
+        if result is not None and warm_start == "value":
+            v0, _ = transfer_solution(k_prev, k_grid, value=result.value)
+        elif result is not None:
+            _, policy0 = transfer_solution(k_prev, k_grid, policy=result.policy)
+        result = value_iteration(crit, max_iter, u_grid, beta, v0=v0, policy0=policy0, **kwargs)
+
+        stats.append({"num_states": num_states, "num_iter": result.num_iter, "time": time() - start})
+        k_prev = k_grid
+
+    result.info["levels"] = stats
+
+    return k_grid, c_grid, u_grid, result
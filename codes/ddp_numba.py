@@ -0,0 +1,264 @@
+"""
+Numba-compiled kernels mirroring `ddp_algorithms`
+
+The kernels fuse the NaN-masking, the Bellman update and the argmax into a
+single loop over the grid. They are selected with `backend="numba"` in the
+solvers of `ddp_algorithms`, which fall back to numpy when numba is absent.
+
+Compiled functions are cached on disk next to this module, so the JIT cost is
+paid once per machine. Set the environment variable DDP_NUMBA_CACHE=0 before
+importing to disable the cache.
+
+"""
+
+import os
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+HAS_NUMBA = numba is not None
+
+CACHE = os.environ.get("DDP_NUMBA_CACHE", "1") != "0"
+
+# Search codes of `monotone_bellman_max`
+SEARCH_CODES = {"scan": 0, "concave": 1, "binary": 2}
+
+def _jit(fnc):
+    """
+    Compile `fnc` in nopython mode, or return it unchanged without numba
+    """
+    if not HAS_NUMBA:
+        return fnc
+    return numba.njit(cache=CACHE)(fnc)
+
+@_jit
+def bellman_max(u_grid, val_old, beta, value_fn, policy, infeasible=-np.inf):
+    """
+    Fused `bellman_equation` and `state_wise_max`.
+
+    Writes the maximum of u_grid[:, i] + beta*val_old over the actions into
+    `value_fn` and its first argmax into `policy`. Infeasible (NaN) actions
+    score `infeasible`: -inf skips them as `fused_bellman_max` does, 0.0
+    counts them as 0 as the "dense" kernel does.
+    """
+    num_actions, num_states = u_grid.shape
+    for i in range(num_states):
+        value_fn[i] = -np.inf
+        policy[i] = 0
+
+    # Row-wise sweep keeps the memory access contiguous
+    for j in range(num_actions):
+        cont = beta*val_old[j]
+        for i in range(num_states):
+            u = u_grid[j, i]
+            v = infeasible if np.isnan(u) else u + cont
+            if v > value_fn[i]:
+                value_fn[i] = v
+                policy[i] = j
+
+@_jit
+def _objective(u_grid, val_old, beta, j, i):
+    u = u_grid[j, i]
+    if np.isnan(u):
+        return -np.inf
+    return u + beta*val_old[j]
+
+@_jit
+def monotone_bellman_max(u_grid, val_old, beta, search, value_fn, policy):
+    """
+    Compiled `monotone_state_wise_max`, `search` is a code of SEARCH_CODES
+    """
+    num_actions, num_states = u_grid.shape
+    lower = 0
+    for i in range(num_states):
+        if search == 0:
+            j, best = lower, _objective(u_grid, val_old, beta, lower, i)
+            for a in range(lower + 1, num_actions):
+                candidate = _objective(u_grid, val_old, beta, a, i)
+                if candidate > best:
+                    j, best = a, candidate
+
+        elif search == 1:
+            j, best = lower, _objective(u_grid, val_old, beta, lower, i)
+            while j + 1 < num_actions:
+                candidate = _objective(u_grid, val_old, beta, j + 1, i)
+                if candidate <= best:
+                    break
+                j, best = j + 1, candidate
+
+        else:
+            a, b = lower, num_actions - 1
+            if np.isnan(u_grid[b, i]):
+                hi = b
+                while hi - a > 1:
+                    mid = (a + hi) // 2
+                    if np.isnan(u_grid[mid, i]):
+                        hi = mid
+                    else:
+                        a = mid
+                a, b = lower, a
+
+            while b - a > 1:
+                mid = (a + b) // 2
+                if _objective(u_grid, val_old, beta, mid, i) < _objective(u_grid, val_old, beta, mid + 1, i):
+                    a = mid + 1
+                else:
+                    b = mid
+            f_a = _objective(u_grid, val_old, beta, a, i)
+            f_b = _objective(u_grid, val_old, beta, b, i)
+            if f_a >= f_b:
+                j, best = a, f_a
+            else:
+                j, best = b, f_b
+
+        value_fn[i] = best
+        policy[i] = j
+        lower = j
+
+@_jit
+def policy_utility(policy, u_grid):
+    """
+    Utility vector U_policy[i] = u_grid[policy[i], i]
+    """
+    num_states = len(policy)
+    U_policy = np.empty(num_states)
+    for i in range(num_states):
+        U_policy[i] = u_grid[policy[i], i]
+    return U_policy
+
+@_jit
+def evaluate_policy(policy, u_grid, beta):
+    """
+    Compiled dense policy evaluation, solves (I - beta * Q_policy) v = U_policy
+    """
+    num_states = len(policy)
+    A = np.identity(num_states)
+    for i in range(num_states):
+        A[i, policy[i]] -= beta
+    return np.linalg.solve(A, policy_utility(policy, u_grid))
+
+@_jit
+def iterate_policy(policy, U_policy, value, beta, k, crit):
+    """
+    Apply v <- U_policy + beta * v[policy] at most k times, stopping
+    when the sup-norm change falls below `crit`.
+    Returns (value, steps, first_diff, last_diff) as `iterate_policy`.
+    """
+    num_states = len(policy)
+    val_new = np.empty(num_states)
+    first_diff = last_diff = 0.0
+    step = 0
+    for step in range(1, k + 1):
+        last_diff = 0.0
+        for i in range(num_states):
+            val_new[i] = U_policy[i] + beta*value[policy[i]]
+            last_diff = max(last_diff, abs(val_new[i] - value[i]))
+        if step == 1:
+            first_diff = last_diff
+        if last_diff < crit:
+            break
+        value[:] = val_new
+    return value, step, first_diff, last_diff
+
+@_jit
+def gauss_seidel_bellman_max(u_grid, value_fn, beta, order, policy):
+    """
+    Compiled `gauss_seidel_bellman_max`: updates `value_fn` in place, state
+    by state in `order`, skipping infeasible (NaN) actions
+    """
+    num_actions = u_grid.shape[0]
+    for i in order:
+        best, arg = -np.inf, 0
+        for j in range(num_actions):
+            u = u_grid[j, i]
+            if not np.isnan(u) and u + beta*value_fn[j] > best:
+                best, arg = u + beta*value_fn[j], j
+        value_fn[i] = best
+        policy[i] = arg
+
+@_jit
+def gauss_seidel_iterate_policy(policy, U_policy, value, beta, k, crit, order):
+    """
+    `iterate_policy` with in-place updates, state by state in `order`
+    """
+    first_diff = last_diff = 0.0
+    step = 0
+    for step in range(1, k + 1):
+        last_diff = 0.0
+        for i in order:
+            v = U_policy[i] + beta*value[policy[i]]
+            last_diff = max(last_diff, abs(v - value[i]))
+            value[i] = v
+        if step == 1:
+            first_diff = last_diff
+        if last_diff < crit:
+            break
+    return value, step, first_diff, last_diff
+
+@_jit
+def evaluate_policy_cycle(policy, U_policy, beta):
+    """
+    Compiled `_evaluate_policy_cycle`, exact O(n) evaluation on the cycles
+    of i -> policy[i]
+    """
+    num_states = len(policy)
+    value = np.zeros(num_states)
+    # 0: not visited, 1: on the current path, 2: value known
+    status = np.zeros(num_states, dtype=np.int8)
+    path = np.empty(num_states, dtype=np.int64)
+
+    for start in range(num_states):
+        length = 0
+        i = start
+        while status[i] == 0:
+            status[i] = 1
+            path[length] = i
+            length += 1
+            i = policy[i]
+
+        stop = length
+        if status[i] == 1:
+            # The path closed a new cycle at state i
+            first = 0
+            while path[first] != i:
+                first += 1
+            discounted, discount = 0.0, 1.0
+            for t in range(first, length):
+                discounted += discount*U_policy[path[t]]
+                discount *= beta
+            value[i] = discounted/(1 - discount)
+            status[i] = 2
+            # Walk back around the cycle to i, then down the tail
+            for t in range(length - 1, first, -1):
+                c = path[t]
+                value[c] = U_policy[c] + beta*value[policy[c]]
+                status[c] = 2
+            stop = first
+
+        for t in range(stop - 1, -1, -1):
+            c = path[t]
+            value[c] = U_policy[c] + beta*value[policy[c]]
+            status[c] = 2
+
+    return value
+
+@_jit
+def ragged_bellman_max(data, offsets, val_old, beta, value_fn, policy):
+    """
+    Compiled `ddp_ragged.bellman_max` on the `data` and `offsets` of a
+    RaggedGrid: the actions of state i are 0 .. offsets[i+1] - offsets[i] - 1
+    """
+    num_states = len(offsets) - 1
+    for i in range(num_states):
+        start = offsets[i]
+        best, arg = data[start] + beta*val_old[0], 0
+        for j in range(1, offsets[i + 1] - start):
+            v = data[start + j] + beta*val_old[j]
+            if v > best:
+                best, arg = v, j
+        value_fn[i] = best
+        policy[i] = arg
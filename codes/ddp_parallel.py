@@ -0,0 +1,172 @@
+"""
+Parallel calibration runner over parameter grids
+
+The utility grid of every parameter set is built once in the parent process
+and placed in `multiprocessing.shared_memory`, so the workers of a
+`ProcessPoolExecutor` attach to it instead of receiving a pickled copy.
+All requested solvers of a parameter set share the same grid. Results are
+streamed back as soon as a chunk of tasks finishes.
+
+"""
+
+import itertools
+import os
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from codes.ddp_auxiliary import get_grid
+from codes.ddp_algorithms import value_iteration
+from codes.ddp_algorithms import policy_iteration
+from codes.ddp_algorithms import modified_policy_iteration
+
+SOLVERS = ("value_iteration", "policy_iteration", "modified_policy_iteration")
+
+def parameter_grid(**axes):
+    """
+    Cartesian product of parameter values
+
+    Example: parameter_grid(beta=[0.9, 0.95], alpha=0.3, delta=0.1, sigma=[2, 3])
+    gives four dictionaries of (beta, alpha, delta, sigma).
+    """
+    names = list(axes)
+    values = [np.atleast_1d(axes[name]).tolist() for name in names]
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+def _share_grid(u_grid):
+    """
+    Copy `u_grid` into a new shared memory block
+    """
+    shm = SharedMemory(create=True, size=u_grid.nbytes)
+    shared = np.ndarray(u_grid.shape, dtype=u_grid.dtype, buffer=shm.buf)
+    shared[:] = u_grid
+    del shared
+    return shm, (shm.name, u_grid.shape, u_grid.dtype.str)
+
+def _attach_grid(spec):
+    """
+    Attach to a shared grid created by the parent process, which owns it
+    """
+    name, shape, dtype = spec
+    # Workers share the parent's resource tracker, which unlinks the
+    # block if the parent dies before doing it itself
+    shm = SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+def _call_solver(solver, u_grid, beta, options, seed):
+    """
+    Run one of SOLVERS with history "none" and return its DPResult
+    """
+    crit, max_iter, k = options["crit"], options["max_iter"], options["k"]
+    kwargs = options["kwargs"]
+
+    if solver == "value_iteration":
+        return value_iteration(crit, max_iter, u_grid, beta, history="none", **kwargs)
+    if solver == "policy_iteration":
+        return policy_iteration(max_iter, u_grid, beta, history="none", seed=seed, **kwargs)
+    return modified_policy_iteration(crit, k, max_iter, u_grid, beta, history="none", **kwargs)
+
+def _solve_chunk(tasks, options):
+    """
+    Worker entry point: solve every (index, params, solver, spec, seed) task
+    """
+    results = []
+    for index, params, solver, spec, seed in tasks:
+        shm, u_grid = _attach_grid(spec)
+        try:
+            result = _call_solver(solver, u_grid, params["beta"], options, seed)
+        finally:
+            del u_grid
+            shm.close()
+        results.append((index, params, solver, result))
+    return results
+
+def run_sweep(param_grid, num_states, solvers=None, dev=None, crit=None, max_iter=500, k=None,
+              workers=None, chunksize=1, seed=None, **solver_kwargs):
+    """
+    Solve every parameter set of `param_grid` in a process pool.
+
+    Parameters
+    ----------
+    param_grid : list of dict
+            Parameter sets with keys beta, alpha, delta and sigma, e.g.
+            from `parameter_grid`.
+
+    solvers : str or list of str, optional
+            Names from SOLVERS, "value_iteration" by default.
+
+    workers : int, optional
+            Number of worker processes, `os.cpu_count()` by default.
+
+    chunksize : int, optional
+            Number of parameter sets sent to a worker as one task.
+
+    seed : int, optional
+            Root seed. Parameter set i always uses the i-th child of
+            `np.random.SeedSequence(seed)` for `random_policy`, so results do
+            not depend on the number of workers or the scheduling.
+
+    solver_kwargs
+            Passed on to every solver, e.g. backend="numba".
+
+    Yields
+    ------
+    (index, params, solver, result) as soon as the chunk holding it is
+    done, where `result` is the solver's `DPResult`.
+    """
+    if solvers is None:
+        solvers = ["value_iteration"]
+    if isinstance(solvers, str):
+        solvers = [solvers]
+    for solver in solvers:
+        if solver not in SOLVERS:
+            raise ValueError("Unknown solver: {}".format(solver))
+
+    if workers is None:
+        workers = os.cpu_count()
+
+    options = {"crit": crit, "max_iter": max_iter, "k": k, "kwargs": solver_kwargs}
+    seeds = np.random.SeedSequence(seed).spawn(len(param_grid))
+    chunks = [range(start, min(start + chunksize, len(param_grid)))
+              for start in range(0, len(param_grid), chunksize)]
+    chunks = iter(chunks)
+
+    pending = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+
+        def submit(chunk):
+            blocks, tasks = [], []
+            for index in chunk:
+                params = param_grid[index]
+                _, _, u_grid = get_grid(dev, num_states, **params)
+                shm, spec = _share_grid(u_grid)
+                blocks.append(shm)
+                tasks += [(index, params, solver, spec, seeds[index]) for solver in solvers]
+            pending[executor.submit(_solve_chunk, tasks, options)] = blocks
+
+        # Bound the number of grids alive in shared memory
+        for chunk in itertools.islice(chunks, 2*workers):
+            submit(chunk)
+
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for shm in pending.pop(future):
+                        shm.close()
+                        shm.unlink()
+                    chunk = next(chunks, None)
+                    if chunk is not None:
+                        submit(chunk)
+                    yield from future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+            for blocks in pending.values():
+                for shm in blocks:
+                    shm.close()
+                    shm.unlink()
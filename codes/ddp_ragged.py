@@ -0,0 +1,148 @@
+"""
+Compact utility grids holding the feasible actions only
+
+Consumption falls with k', so the feasible actions of every state form a
+prefix 0 <= j < limits[i] of the capital grid. A `RaggedGrid` stores these
+prefixes one after the other, state by state (CSR layout without column
+indices), instead of the NaN-padded n×n `u_grid`. The solvers of
+`ddp_algorithms` accept it in place of `u_grid`.
+
+"""
+
+import numpy as np
+
+from codes.ddp_functions import crra
+from codes.ddp_auxiliary import capital_grid
+from codes.ddp_auxiliary import feasible_limits
+
+class RaggedGrid:
+    """
+    Utility of the feasible actions of every state.
+
+    Attributes
+    ----------
+    data : array_like(float, ndim=1)
+        Utilities u[j, i] of the actions j < limits[i], state after state.
+
+    limits : ndarray(int, ndim=1)
+        Number of feasible actions of every state, at least one.
+
+    offsets : ndarray(int, ndim=1)
+        Start of every state in `data`, of length n + 1.
+
+    actions : ndarray(unsigned int, ndim=1)
+        Action of every entry of `data`, of the smallest unsigned type
+        holding n - 1 (uint16 up to 65536 states).
+    """
+
+    def __init__(self, data, limits):
+        self.data = np.asarray(data)
+        self.limits = np.asarray(limits, dtype= np.intp)
+        if np.any(self.limits < 1):
+            raise ValueError("Every state needs a feasible action")
+
+        self.offsets = np.concatenate(([0], np.cumsum(self.limits)))
+        if len(self.data) != self.offsets[-1]:
+            raise ValueError("data must hold limits.sum() utilities")
+        actions = np.arange(len(self.data)) - np.repeat(self.offsets[:-1], self.limits)
+        self.actions = actions.astype(np.min_scalar_type(max(len(self.limits) - 1, 0)))
+
+    @classmethod
+    def from_dense(cls, u_grid):
+        """
+        Compact a NaN-padded u_grid[k_action, k_state] whose feasible
+        actions are a prefix for every state, as from `get_grid`
+        """
+        feasible = ~np.isnan(u_grid)
+        limits = feasible.sum(axis=0)
+        if not np.array_equal(feasible, np.arange(len(u_grid))[:,None] < limits):
+            raise ValueError("The feasible actions of every state must be a prefix")
+        return cls(u_grid.T[feasible.T], limits)
+
+    def __len__(self):
+        return len(self.limits)
+
+    @property
+    def shape(self):
+        """Shape (n, n) of the dense grid"""
+        return (len(self.limits), len(self.limits))
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + self.actions.nbytes + self.offsets.nbytes + self.limits.nbytes
+
+    def todense(self):
+        """NaN-padded u_grid[k_action, k_state]"""
+        u_grid = np.full(self.shape, np.nan, dtype= self.data.dtype)
+        u_grid[self.actions, np.repeat(np.arange(len(self)), self.limits)] = self.data
+        return u_grid
+
+def get_ragged_grid(dev, num_states, beta, alpha, delta, sigma, dtype=None):
+    """
+    Create the capital grid and the `RaggedGrid` of the utilities of
+    `get_grid`, without building any n×n grid
+
+    Returns
+    -------
+    k_grid : array_like(float, ndim=1)
+            Capital grid
+
+    u_ragged : RaggedGrid
+            Utilities of the feasible actions, of type `dtype` (float64 by default)
+    """
+    k_grid = capital_grid(dev, num_states, beta, alpha, delta)
+    limits = feasible_limits(k_grid, alpha, delta)
+
+    # Consumption of every feasible (k_state, k_action) pair, state after state
+    wealth = np.power(k_grid, alpha) + (1 - delta)*k_grid
+    data = np.repeat(wealth, limits).astype(dtype or float)
+    u_ragged = RaggedGrid(data, limits)
+    np.subtract(data, k_grid[u_ragged.actions], out=data)
+
+    # Utility in place
+    crra(data, sigma, out=data)
+
+    return k_grid, u_ragged
+
+def bellman_max(u_ragged, val_old, beta, work=None, value_fn=None, policy=None):
+    """
+    Bellman update and state-wise maximum over the feasible actions only,
+    `fused_bellman_max` for a `RaggedGrid`
+
+    `work` is an optional buffer of the length of `u_ragged.data`.
+    Returns the value function and the first maximizing action of every state.
+    """
+    if work is None:
+        work = np.empty(len(u_ragged.data))
+    if value_fn is None:
+        value_fn = np.empty(len(u_ragged))
+    if policy is None:
+        policy = np.empty(len(u_ragged), dtype= np.intp)
+
+    np.take(val_old, u_ragged.actions, out=work)
+    work *= beta
+    work += u_ragged.data
+
+    starts = u_ragged.offsets[:-1]
+    value_fn[:] = np.maximum.reduceat(work, starts)
+
+    # First entry of every state reaching the maximum
+    hits = np.flatnonzero(work == np.repeat(value_fn, u_ragged.limits))
+    states = np.searchsorted(u_ragged.offsets, hits, side="right") - 1
+    first = np.flatnonzero(np.diff(states, prepend=-1))
+    policy[:] = u_ragged.actions[hits[first]]
+    return value_fn, policy
+
+def policy_utility(u_ragged, policy):
+    """
+    Utility vector U_policy[i] = u[policy[i], i]
+    """
+    return u_ragged.data[u_ragged.offsets[:-1] + np.asarray(policy)]
+
+def random_policy(u_ragged, seed=None):
+    """
+    Random feasible action of every state, see `random_policy` of `ddp_algorithms`
+    """
+    if seed is None:
+        return np.random.randint(0, u_ragged.limits)
+    return np.random.default_rng(seed).integers(0, u_ragged.limits)
@@ -4,13 +4,15 @@ from numpy.testing import assert_equal
 from numpy.testing import assert_almost_equal
 import pytest
 
-from ddp_functions import crra
-from ddp_functions import crra_prime
-from ddp_functions import crra_dprime
-from ddp_functions import f_dprime
-from ddp_functions import f
-from ddp_functions import consumption_ss
-from ddp_functions import capital_ss
+from codes.ddp_functions import crra
+from codes.ddp_functions import crra_prime
+from codes.ddp_functions import crra_dprime
+from codes.ddp_functions import f_dprime
+from codes.ddp_functions import f
+from codes.ddp_functions import consumption_ss
+from codes.ddp_functions import capital_ss
+from codes.ddp_functions import tauchen
+from codes.ddp_functions import rouwenhorst
 
 @pytest.fixture
 def np_expected_utility():
@@ -117,5 +119,24 @@ def test_steady_state():
     css = consumption_ss(kss, alpha, delta)
     assert_almost_equal(css, 0.8915924043)
 
+@pytest.mark.parametrize("discretize", [tauchen, rouwenhorst])
+def test_shock_discretization(discretize):
+    z_grid, transition = discretize(7, 0.9, 0.02)
+    assert transition.shape == (7, 7)
+    assert_array_almost_equal(transition.sum(axis=1), np.ones(7))
+    assert_array_almost_equal(z_grid, -z_grid[::-1])
 
+    # Rouwenhorst matches the conditional mean exactly
+    if discretize is rouwenhorst:
+        assert_array_almost_equal(transition.dot(z_grid), 0.9*z_grid)
 
+
+def test_crra_in_place():
+    c = np.array([[0.5, 1.0], [2.0, np.nan]])
+    expected = crra(c, 3)
+
+    out = np.empty_like(c)
+    assert crra(c, 3, out=out) is out
+    assert_array_almost_equal(out, expected)
+    crra(c, 3, out=c)
+    assert_array_almost_equal(c, expected)
@@ -0,0 +1,27 @@
+import pytest
+from numpy.testing import assert_array_almost_equal
+from numpy.testing import assert_array_equal
+
+from codes.ddp_auxiliary import get_grid
+from codes.ddp_algorithms import value_iteration
+from codes.ddp_matrix_free import matrix_free_value_iteration
+
+def test_matrix_free_value_iteration(setup_ramsey):
+    k_grid, c_grid, u_grid = get_grid(dev = None, num_states = 50, **setup_ramsey)
+    value_store_iter, store_policy, num_iter = value_iteration(1e-06, 500, u_grid, setup_ramsey["beta"])
+
+    result = matrix_free_value_iteration(1e-06, 500, k_grid, tile = 7, **setup_ramsey)
+    assert result.num_iter == num_iter
+    assert_array_equal(result.policy, store_policy[num_iter,:])
+    assert_array_almost_equal(result.value, value_store_iter[num_iter,:], decimal=10)
+
+def test_matrix_free_infeasible_actions(setup_ramsey):
+    # A wide grid with negative utilities, where counting infeasible
+    # actions as 0 would pick them
+    k_grid, c_grid, u_grid = get_grid(0.6, 80, **setup_ramsey)
+    expected = value_iteration(1e-06, 1000, u_grid, setup_ramsey["beta"], history="none")
+
+    result = matrix_free_value_iteration(1e-06, 1000, k_grid, tile = 7, **setup_ramsey)
+    assert result.num_iter == expected.num_iter
+    assert_array_equal(result.policy, expected.policy)
+    assert_array_almost_equal(result.value, expected.value, decimal=10)
@@ -0,0 +1,23 @@
+from numpy.testing import assert_array_almost_equal
+from numpy.testing import assert_array_equal
+
+from codes.ddp_algorithms import value_iteration
+from codes.ddp_multigrid import multigrid_value_iteration
+
+def test_multigrid_value_iteration(setup_ramsey):
+    k_grid, c_grid, u_grid, result = multigrid_value_iteration(1e-06, 1000, None, [20, 80], **setup_ramsey)
+    expected = value_iteration(1e-06, 1000, u_grid, setup_ramsey["beta"], history="none")
+
+    assert len(k_grid) == 80
+    assert [level["num_states"] for level in result.info["levels"]] == [20, 80]
+    assert result.num_iter < expected.num_iter
+    assert_array_equal(result.policy, expected.policy)
+    assert_array_almost_equal(result.value, expected.value, decimal=4)
+
+def test_multigrid_policy_warm_start(setup_ramsey):
+    k_grid, c_grid, u_grid, result = multigrid_value_iteration(
+        1e-06, 1000, None, [20, 80], **setup_ramsey, warm_start="policy", history=None)
+    expected = value_iteration(1e-06, 1000, u_grid, setup_ramsey["beta"], history="none")
+
+    assert result.num_iter < expected.num_iter
+    assert_array_equal(result.policy, expected.policy)
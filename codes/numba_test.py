@@ -0,0 +1,40 @@
+import pytest
+import numpy as np
+from numpy.testing import assert_array_almost_equal
+from numpy.testing import assert_array_equal
+
+from codes.ddp_algorithms import value_iteration
+from codes.ddp_algorithms import modified_policy_iteration
+from codes.ddp_algorithms import evaluate_policy
+
+pytest.importorskip("numba")
+
+@pytest.mark.parametrize("kernel", [None, "monotone", "concave", "binary"])
+def test_numba_value_iteration(setup_ramsey_grid, kernel):
+    k_grid, u_grid, beta = setup_ramsey_grid
+    value_store_iter, store_policy, num_iter = value_iteration(1e-06, 500, u_grid, beta)
+    value_numba, policy_numba, num_iter_numba = value_iteration(
+        1e-06, 500, u_grid, beta, kernel=kernel, backend="numba")
+
+    assert num_iter_numba == num_iter
+    assert_array_equal(policy_numba, store_policy)
+    assert_array_almost_equal(value_numba, value_store_iter, decimal=10)
+
+def test_numba_modified_policy_iteration(setup_ramsey_grid):
+    k_grid, u_grid, beta = setup_ramsey_grid
+    value_store_iter, store_policy, num_iter = modified_policy_iteration(1e-06, 30, 500, u_grid, beta)
+    value_numba, policy_numba, num_iter_numba = modified_policy_iteration(
+        1e-06, 30, 500, u_grid, beta, backend="numba")
+
+    assert num_iter_numba == num_iter
+    assert_array_equal(policy_numba, store_policy)
+    assert_array_almost_equal(value_numba, value_store_iter, decimal=10)
+
+def test_numba_evaluate_policy(setup_ramsey_grid):
+    k_grid, u_grid, beta = setup_ramsey_grid
+    policy = np.arange(len(u_grid)) // 2
+    assert_array_almost_equal(
+        evaluate_policy(policy, u_grid, beta, backend="numba"),
+        evaluate_policy(policy, u_grid, beta),
+        decimal=8
+    )
@@ -0,0 +1,31 @@
+from numpy.testing import assert_array_equal
+
+from codes.ddp_auxiliary import get_grid
+from codes.ddp_algorithms import value_iteration
+from codes.ddp_parallel import parameter_grid
+from codes.ddp_parallel import run_sweep
+
+def test_parameter_grid():
+    grid = parameter_grid(beta=[0.9, 0.95], alpha=0.3, delta=0.1, sigma=[2, 3])
+    assert len(grid) == 4
+    assert grid[1] == {"beta": 0.9, "alpha": 0.3, "delta": 0.1, "sigma": 3}
+
+def test_run_sweep():
+    grid = parameter_grid(beta=[0.9, 0.95], alpha=[0.3, 0.35], delta=0.1, sigma=2)
+    solvers = ["value_iteration", "policy_iteration"]
+    results = list(run_sweep(grid, 30, solvers=solvers, workers=2, seed=1))
+    assert sorted((index, solver) for index, _, solver, _ in results) == sorted(
+        (index, solver) for index in range(4) for solver in solvers)
+
+    # Same seeds for random_policy whatever the number of workers and chunks
+    rerun = {index: result for index, _, _, result in
+             run_sweep(grid, 30, solvers="policy_iteration", workers=1, chunksize=3, seed=1)}
+
+    for index, params, solver, result in results:
+        if solver == "value_iteration":
+            k_grid, c_grid, u_grid = get_grid(None, 30, **params)
+            expected = value_iteration(None, 500, u_grid, params["beta"], history="none")
+            assert_array_equal(result.policy, expected.policy)
+        else:
+            assert result.num_iter == rerun[index].num_iter
+            assert_array_equal(result.value, rerun[index].value)
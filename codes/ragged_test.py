@@ -0,0 +1,57 @@
+import pytest
+import numpy as np
+from numpy.testing import assert_array_almost_equal
+from numpy.testing import assert_array_equal
+
+from codes.ddp_auxiliary import get_grid
+from codes.ddp_algorithms import value_iteration
+from codes.ddp_algorithms import policy_iteration
+from codes.ddp_algorithms import modified_policy_iteration
+from codes.ddp_ragged import RaggedGrid
+from codes.ddp_ragged import get_ragged_grid
+
+@pytest.fixture
+def setup_wide_grid(setup_ramsey):
+    # A wide grid, so that about a third of the actions are infeasible
+    k_grid, c_grid, u_grid = get_grid(dev = 0.9, num_states = 60, **setup_ramsey)
+    return u_grid, setup_ramsey
+
+def test_ragged_grid(setup_wide_grid):
+    u_grid, paras = setup_wide_grid
+    u_ragged = RaggedGrid.from_dense(u_grid)
+    assert_array_equal(u_ragged.todense(), u_grid)
+    assert len(u_ragged.data) == np.sum(~np.isnan(u_grid))
+    assert u_ragged.nbytes < u_grid.nbytes
+
+    k_grid, direct = get_ragged_grid(0.9, 60, **paras)
+    assert_array_equal(direct.limits, u_ragged.limits)
+    assert_array_almost_equal(direct.data, u_ragged.data, decimal=12)
+
+    with pytest.raises(ValueError):
+        RaggedGrid.from_dense(u_grid[::-1])
+
+@pytest.mark.parametrize("backend", [None, "numba"])
+def test_ragged_solvers(setup_wide_grid, backend):
+    u_grid, paras = setup_wide_grid
+    beta = paras["beta"]
+    u_ragged = RaggedGrid.from_dense(u_grid)
+
+    value, policy, num_iter = value_iteration(1e-06, 500, u_grid, beta, kernel="fused")
+    value_r, policy_r, num_iter_r = value_iteration(1e-06, 500, u_ragged, beta, backend=backend)
+    assert num_iter_r == num_iter
+    assert_array_equal(policy_r[num_iter_r], policy[num_iter])
+    assert_array_almost_equal(value_r[num_iter_r], value[num_iter], decimal=10)
+
+    result = policy_iteration(500, u_ragged, beta, history="none", backend=backend, seed=0)
+    assert_array_equal(result.policy, policy[num_iter])
+
+    result = modified_policy_iteration(1e-06, 20, 500, u_ragged, beta, history="none", backend=backend)
+    assert_array_equal(result.policy, policy[num_iter])
+
+def test_ragged_unsupported(setup_wide_grid):
+    u_grid, paras = setup_wide_grid
+    u_ragged = RaggedGrid.from_dense(u_grid)
+    with pytest.raises(ValueError):
+        value_iteration(1e-06, 500, u_ragged, paras["beta"], kernel="monotone")
+    with pytest.raises(ValueError):
+        value_iteration(1e-06, 500, u_ragged, paras["beta"], sweep="gauss-seidel")